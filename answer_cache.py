@@ -0,0 +1,89 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from disk_cache import make_key
+from retrieval import HashingEmbedder
+
+PUNCT_RE = re.compile(r"[^\w\s]", re.UNICODE)
+
+
+def normalize_question(question):
+    question = unicodedata.normalize("NFKC", question).casefold()
+    return " ".join(PUNCT_RE.sub(" ", question).split())
+
+
+def documents_fingerprint(file_keys, *settings):
+    """Fingerprint of (name, sha256) pairs plus anything else that changes the answer."""
+    return make_key(*sorted(f"{name}:{sha256}" for name, sha256 in file_keys), *settings)
+
+
+class AnswerCache:
+    """
+    In-process answer cache with TTL and LRU eviction.
+
+    Keys combine a documents fingerprint with the normalized question, so any file edit
+    changes the fingerprint and misses. With similarity < 1.0, a question whose hashed
+    embedding is at least that cosine-similar to a cached one for the same fingerprint hits too.
+    """
+
+    def __init__(self, max_entries=512, ttl=24 * 3600, similarity=1.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._embedder = HashingEmbedder(dim=512)
+        self._lock = threading.Lock()
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, fingerprint, question, similarity=None):
+        similarity = self.similarity if similarity is None else similarity
+        normalized = normalize_question(question)
+        key = (fingerprint, normalized)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[1]):
+                del self._entries[key]
+                entry = None
+            if entry is None and similarity < 1.0:
+                vector = self._embedder.embed([normalized])[0]
+                best = similarity
+                for other_key, other in list(self._entries.items()):
+                    if other_key[0] != fingerprint:
+                        continue
+                    if self._expired(other[1]):
+                        del self._entries[other_key]
+                        continue
+                    score = float(other[2] @ vector)
+                    if score >= best:
+                        best, key, entry = score, other_key, other
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, fingerprint, question, answer):
+        normalized = normalize_question(question)
+        vector = self._embedder.embed([normalized])[0]
+        with self._lock:
+            self._entries[(fingerprint, normalized)] = (answer, time.time(), vector)
+            self._entries.move_to_end((fingerprint, normalized))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, fingerprint):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == fingerprint]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
@@ -0,0 +1,65 @@
+import functools
+import os
+import re
+import tempfile
+import time
+import unicodedata
+
+from disk_cache import DiskCache, make_key
+
+AUDIO_CACHE_BYTES = int(os.environ.get("TAKTAK_AUDIO_CACHE_MB", "1024")) * 1024 * 1024
+
+# Files earlier versions of both apps left behind: tempfile.mktemp() and uuid4() names
+ORPHAN_AUDIO_RE = re.compile(
+    r"^(tmp[a-z0-9_]{8}|[0-9a-f]{8}-[0-9a-f]{4}-4[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12})\.mp3$"
+)
+
+
+def normalize_text(text):
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def audio_key(text, lang, engine):
+    return make_key("audio", engine, lang, normalize_text(text))
+
+
+@functools.lru_cache(maxsize=None)
+def shared_audio_cache():
+    cleanup_orphaned_temp_files()
+    return DiskCache("audio", max_bytes=AUDIO_CACHE_BYTES)
+
+
+def cached_synthesizer(synthesize, engine, cache=None):
+    """Wrap a synthesize(text, lang) callable so each chunk is only synthesized once."""
+    cache = cache or shared_audio_cache()
+
+    def run(text, lang="en"):
+        key = audio_key(text, lang, engine)
+        audio = cache.get(key)
+        if audio is None:
+            audio = synthesize(text, lang)
+            cache.put(key, audio)
+        return audio
+
+    return run
+
+
+def cleanup_orphaned_temp_files(max_age=24 * 3600, temp_dir=None):
+    temp_dir = temp_dir or tempfile.gettempdir()
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        entries = os.scandir(temp_dir)
+    except OSError:
+        return 0
+    with entries:
+        for entry in entries:
+            if not ORPHAN_AUDIO_RE.match(entry.name):
+                continue
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                pass
+    return removed
@@ -0,0 +1,61 @@
+import streamlit as st
+
+from tts_engines import AUDIO_MIME
+
+
+def _clock(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def render_playlist(playlist, key, stem="audio"):
+    """
+    Play a segmented AudioPlaylist one part at a time with previous/next controls and
+    per-part downloads. Only the current part goes through Streamlit's media store,
+    so page and server memory stay the same however long the audio is.
+    """
+    segments = playlist.segments
+    if not segments:
+        return
+    slot = f"{key}_part"
+    index = min(st.session_state.get(slot, 0), len(segments) - 1)
+
+    def move(step):
+        st.session_state[slot] = min(max(index + step, 0), len(segments) - 1)
+        st.session_state[f"{key}_autoplay"] = True
+
+    if len(segments) > 1 or not playlist.complete:
+        prev_col, info_col, next_col = st.columns([1, 6, 1])
+        prev_col.button("⏮", key=f"{key}_prev", on_click=move, args=(-1,), disabled=index == 0)
+        next_col.button("⏭", key=f"{key}_next", on_click=move, args=(1,), disabled=index >= len(segments) - 1)
+        start = playlist.segment_start(index)
+        total = f"{_clock(playlist.total_seconds)}{'' if playlist.complete else '+'}"
+        info_col.caption(
+            f"Part {index + 1} of {len(segments)}{'' if playlist.complete else '+'} · "
+            f"{_clock(start)}–{_clock(start + segments[index]['seconds'])} of {total}"
+        )
+
+    mime = AUDIO_MIME[playlist.format]
+    try:
+        st.audio(playlist.segment_path(index), format=mime, autoplay=st.session_state.pop(f"{key}_autoplay", False))
+        download_col, playlist_col = st.columns(2)
+        with open(playlist.segment_path(index), "rb") as f:
+            download_col.download_button(
+                f"⬇️ Download part {index + 1}" if len(segments) > 1 else "⬇️ Download audio",
+                data=f,
+                file_name=playlist.part_name(index, stem) if len(segments) > 1 else f"{stem}.{playlist.format}",
+                mime=mime,
+                key=f"{key}_download",
+            )
+    except FileNotFoundError:
+        # A partial playlist whose writer just moved it into place; the next rerun shows the final one
+        return
+    if playlist.complete and len(segments) > 1:
+        playlist_col.download_button(
+            "⬇️ Playlist (.m3u)",
+            data=playlist.m3u(stem),
+            file_name=f"{stem}.m3u",
+            mime="audio/x-mpegurl",
+            key=f"{key}_m3u",
+        )
@@ -0,0 +1,265 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+from disk_cache import DEFAULT_CACHE_DIR
+from tts_pipeline import audio_duration, iter_synthesized, join_audio, split_wav, wav_header
+
+SEGMENTS_DIR = os.path.join(DEFAULT_CACHE_DIR, "segments")
+SEGMENT_CACHE_BYTES = int(os.environ.get("TAKTAK_SEGMENT_CACHE_MB", "2048")) * 1024 * 1024
+# Long enough to keep the part list short, small enough that one part is cheap to serve
+SEGMENT_SECONDS = 300
+MANIFEST = "playlist.json"
+
+
+def playlist_dir(key, root=SEGMENTS_DIR):
+    return os.path.join(root, key[:2], key)
+
+
+def _tmp_name(path):
+    # Unique per writer, so concurrent sessions building the same playlist never share a file
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def _write_atomic(path, data):
+    tmp = _tmp_name(path)
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class AudioPlaylist:
+    """
+    Audio kept on disk as consecutive segment files plus a playlist.json manifest.
+
+    Segments can be played and downloaded one at a time while the rest is still being
+    written; complete is set once the last segment is on disk.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        try:
+            with open(os.path.join(directory, MANIFEST), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        self.format = manifest.get("format", "mp3")
+        self.segments = manifest.get("segments", [])
+        self.complete = manifest.get("complete", False)
+
+    @property
+    def total_seconds(self):
+        return sum(s["seconds"] for s in self.segments)
+
+    @property
+    def total_bytes(self):
+        return sum(s["bytes"] for s in self.segments)
+
+    def segment_path(self, index):
+        return os.path.join(self.directory, self.segments[index]["file"])
+
+    def segment_start(self, index):
+        return sum(s["seconds"] for s in self.segments[:index])
+
+    def touch(self):
+        try:
+            os.utime(os.path.join(self.directory, MANIFEST))
+        except OSError:
+            pass
+
+    def part_name(self, index, stem="audio"):
+        return f"{stem}-part-{index + 1:03d}.{self.format}"
+
+    def m3u(self, stem="audio"):
+        """Playlist of the parts as downloaded with part_name()."""
+        lines = ["#EXTM3U"]
+        for index, segment in enumerate(self.segments):
+            lines.append(f"#EXTINF:{round(segment['seconds'])},{stem} part {index + 1}")
+            lines.append(self.part_name(index, stem))
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """Write the whole playlist as one audio file, one segment in memory at a time."""
+        tmp = _tmp_name(path)
+        with open(tmp, "wb") as out:
+            if self.format == "wav":
+                fmt, size = None, 0
+                for index in range(len(self.segments)):
+                    with open(self.segment_path(index), "rb") as f:
+                        segment_fmt, pcm = split_wav(f.read())
+                    if fmt is None:
+                        fmt = segment_fmt
+                        out.write(wav_header(fmt, 0))
+                    out.write(pcm)
+                    size += len(pcm)
+                if fmt is not None:
+                    # Sizes are only known at the end, so the header is rewritten in place
+                    out.seek(0)
+                    out.write(wav_header(fmt, size))
+            else:
+                for index in range(len(self.segments)):
+                    with open(self.segment_path(index), "rb") as f:
+                        shutil.copyfileobj(f, out)
+        os.replace(tmp, path)
+        return path
+
+
+class PlaylistWriter:
+    """
+    Groups synthesized chunks into segment files of about segment_seconds each. The first
+    segment is written after the first chunk, so playback can start right away.
+
+    Segments are built in a private temporary directory that close() renames to directory,
+    so a playlist that other sessions may be playing is never deleted or rewritten.
+    """
+
+    def __init__(self, directory, audio_format="mp3", segment_seconds=SEGMENT_SECONDS, on_segment=None):
+        self.target = directory
+        self.directory = _tmp_name(directory)
+        self.format = audio_format
+        self.segment_seconds = segment_seconds
+        self.on_segment = on_segment
+        self.segments = []
+        self._parts = []
+        self._seconds = 0.0
+        os.makedirs(self.directory)
+
+    def add(self, audio):
+        self._parts.append(audio)
+        self._seconds += audio_duration(audio, self.format)
+        if not self.segments or self._seconds >= self.segment_seconds:
+            self._flush()
+
+    def _flush(self):
+        if not self._parts:
+            return
+        data = join_audio(self._parts, self.format)
+        name = f"{len(self.segments):05d}.{self.format}"
+        _write_atomic(os.path.join(self.directory, name), data)
+        self.segments.append({"file": name, "seconds": audio_duration(data, self.format), "bytes": len(data)})
+        self._parts = []
+        self._seconds = 0.0
+        self._write_manifest(complete=False)
+        if self.on_segment is not None:
+            self.on_segment(AudioPlaylist(self.directory))
+
+    def _write_manifest(self, complete):
+        manifest = {"format": self.format, "segments": self.segments, "complete": complete}
+        _write_atomic(os.path.join(self.directory, MANIFEST), json.dumps(manifest).encode("utf-8"))
+
+    def close(self):
+        self._flush()
+        self._write_manifest(complete=True)
+        if AudioPlaylist(self.target).complete:
+            # Another writer finished the same playlist first; keep theirs
+            self.discard()
+            return AudioPlaylist(self.target)
+        if os.path.isdir(self.target):
+            # An incomplete leftover; moved aside first since a directory only renames onto an empty one
+            stale = _tmp_name(self.target)
+            os.replace(self.target, stale)
+            shutil.rmtree(stale, ignore_errors=True)
+        try:
+            os.replace(self.directory, self.target)
+        except OSError:
+            if not AudioPlaylist(self.target).complete:
+                raise
+            self.discard()
+        return AudioPlaylist(self.target)
+
+    def discard(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def write_playlist(directory, chunks, lang="en", synthesize=None, audio_format="mp3", max_workers=4,
+                   on_chunk=None, on_segment=None, segment_seconds=SEGMENT_SECONDS):
+    """
+    Synthesize chunks straight into a segmented playlist in directory and return
+    (playlist, stats). A complete playlist already in directory is reused as is. While
+    writing, on_segment gets the partial playlist from the writer's temporary directory.
+    """
+    start = time.perf_counter()
+    chunks = list(chunks)
+    chars = sum(len(c) for c in chunks)
+    playlist = AudioPlaylist(directory)
+    first_audio = None
+    if not playlist.complete:
+        prune_playlists(keep=directory)
+        writer = PlaylistWriter(directory, audio_format, segment_seconds, on_segment)
+        try:
+            for index, audio in iter_synthesized(chunks, lang, synthesize, max_workers):
+                if first_audio is None:
+                    first_audio = time.perf_counter() - start
+                writer.add(audio)
+                if on_chunk is not None:
+                    on_chunk(index, audio)
+        except BaseException:
+            writer.discard()
+            raise
+        playlist = writer.close()
+    else:
+        playlist.touch()
+        if on_segment is not None:
+            on_segment(playlist)
+    elapsed = time.perf_counter() - start
+    stats = {
+        "chunks": len(chunks),
+        "chars": chars,
+        "bytes": playlist.total_bytes,
+        "segments": len(playlist.segments),
+        "audio_seconds": playlist.total_seconds,
+        "time_to_first_audio": first_audio or 0.0,
+        "total_seconds": elapsed,
+        "chars_per_second": chars / elapsed if elapsed else 0.0,
+        "format": playlist.format,
+    }
+    return playlist, stats
+
+
+def prune_playlists(max_bytes=SEGMENT_CACHE_BYTES, root=SEGMENTS_DIR, keep=None, min_age=3600):
+    """
+    Delete the least recently used playlists once their total size exceeds max_bytes, and
+    temporary directories left behind by interrupted writers.
+    """
+    playlists = []
+    total = 0
+    now = time.time()
+    try:
+        shards = list(os.scandir(root))
+    except OSError:
+        return 0
+    for shard in shards:
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard.path):
+            if not entry.is_dir() or entry.path == keep:
+                continue
+            try:
+                size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+                try:
+                    used = os.stat(os.path.join(entry.path, MANIFEST)).st_mtime
+                except FileNotFoundError:
+                    used = entry.stat().st_mtime
+            except OSError:
+                # Renamed into place or removed by another session meanwhile
+                continue
+            if entry.name.endswith(".tmp"):
+                # A live writer refreshes its manifest with every segment
+                if now - used >= min_age:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                continue
+            playlists.append((used, size, entry.path))
+            total += size
+    removed = 0
+    for used, size, path in sorted(playlists):
+        if total <= max_bytes:
+            break
+        # Recently used playlists may still be playing or being written
+        if now - used < min_age:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
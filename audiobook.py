@@ -0,0 +1,195 @@
+import functools
+import json
+
+from audio_cache import cached_synthesizer
+from audio_segments import playlist_dir, write_playlist
+from disk_cache import DiskCache, make_key
+from document_model import SOURCE_OCR, SOURCE_TEXT, ExtractedText
+from language import detect_language, detect_page_languages, dominant_language, nearest_language
+from ocr_engine import OcrPage, ocr_pages_detailed
+from tts_engines import TtsEngine, select_engine
+from tts_pipeline import split_sections, synthesize_chunks
+
+# PDF -> text -> MP3 pipeline shared by the Streamlit app and the batch converter
+
+TESSERACT_LANG_MAP = {
+    'en': 'eng',
+    'ar': 'ara',
+    'es': 'spa',
+    'fr': 'fra',
+    'de': 'deu'
+}
+
+
+@functools.lru_cache(maxsize=None)
+def shared_text_cache():
+    return DiskCache("text", max_bytes=256 * 1024 * 1024)
+
+
+def detect_content_language(text):
+    # Samples a bounded number of characters, so cost does not grow with the document
+    return detect_language(text, default='en', cache=shared_text_cache())
+
+
+def extract_text_with_ocr(document, pages, lang='eng', max_workers=None, adaptive=True, on_page=None):
+    """
+    OCR the given pages; returns [(page, text)].
+
+    lang is one Tesseract code for every page, or a {page: code} dict. With adaptive=True pages
+    start at a low DPI and are only re-rendered at 300 dpi when Tesseract's confidence is low.
+    on_page(OcrPage) reports the DPI, confidence and time of each page; cache hits report
+    what the original run found, with zero seconds.
+    """
+    cache = shared_text_cache()
+    mode = "adaptive" if adaptive else "300"
+    page_lang = (lambda i: lang.get(i, 'eng')) if isinstance(lang, dict) else (lambda i: lang)
+    page_texts = {}
+    missing = []
+    for i in sorted(set(pages)):
+        cached = cache.get_text(make_key(document.sha256, i, "ocr", page_lang(i), mode))
+        if cached is None:
+            missing.append(i)
+            continue
+        cached = json.loads(cached)
+        page_texts[i] = cached["text"]
+        if on_page is not None:
+            on_page(OcrPage(i, cached["text"], cached["dpi"], cached["confidence"]))
+
+    if missing:
+        missing_langs = {i: page_lang(i) for i in missing}
+
+        def store(result):
+            # Cached as each page finishes, so an interrupted run keeps its finished pages
+            page_texts[result.page] = result.text
+            cache.put_text(
+                make_key(document.sha256, result.page, "ocr", missing_langs[result.page], mode),
+                json.dumps({"text": result.text, "dpi": result.dpi, "confidence": result.confidence}),
+            )
+            if on_page is not None:
+                on_page(result)
+
+        ocr_pages_detailed(
+            document.path, missing, lang=missing_langs, dpi=300, max_workers=max_workers, adaptive=adaptive,
+            on_page=store,
+        )
+
+    return [(i, page_texts.get(i, "")) for i in sorted(set(pages))]
+
+
+def extract_text_from_pdf(document, selected_pages, on_ocr=None, ocr_workers=None, on_ocr_page=None,
+                          on_text_page=None):
+    """
+    Extract the selected pages into an ExtractedText; returns (extracted, ocr_pages).
+
+    on_text_page(page) is called after each page's text layer is read. Pages without a text
+    layer are OCR'd; on_ocr(pages) is called before that starts and on_ocr_page(OcrPage)
+    after each page (see extract_text_with_ocr). Any of them may raise to stop extraction.
+    """
+    cache = shared_text_cache()
+    page_count = document.page_count
+    pages = []
+    pages_without_text = []
+
+    for i in selected_pages:
+        if i < 1 or i > page_count:
+            continue
+        key = make_key(document.sha256, i, "text", "")
+        text = cache.get_text(key)
+        if text is None:
+            text = document.page_text(i)
+            cache.put_text(key, text)
+        if text and text.strip():
+            pages.append((i, SOURCE_TEXT, None, text))
+        else:
+            pages_without_text.append(i)
+        if on_text_page is not None:
+            on_text_page(i)
+
+    text_langs = detect_page_languages({i: text for i, _, _, text in pages}, cache=cache)
+    pages = [(i, source, text_langs[i], text) for i, source, _, text in pages]
+
+    valid_ocr_pages = [p for p in pages_without_text if 1 <= p <= page_count]
+    if valid_ocr_pages:
+        if on_ocr is not None:
+            on_ocr(valid_ocr_pages)
+        # Scanned pages start from their nearest text page's language, then get
+        # re-OCR'd in their own language if the OCR output says otherwise
+        fallback = dominant_language(text_langs)
+        guessed = {
+            p: TESSERACT_LANG_MAP.get(nearest_language(p, text_langs, fallback), 'eng')
+            for p in valid_ocr_pages
+        }
+        ocr_results = dict(extract_text_with_ocr(
+            document, valid_ocr_pages, lang=guessed, max_workers=ocr_workers, on_page=on_ocr_page
+        ))
+        ocr_langs = detect_page_languages(ocr_results, default=fallback, cache=cache)
+        retry = {
+            p: TESSERACT_LANG_MAP[l] for p, l in ocr_langs.items()
+            if l in TESSERACT_LANG_MAP and TESSERACT_LANG_MAP[l] != guessed[p]
+        }
+        if retry:
+            ocr_results.update(extract_text_with_ocr(
+                document, list(retry), lang=retry, max_workers=ocr_workers, on_page=on_ocr_page
+            ))
+        for i, text in ocr_results.items():
+            pages.append((i, SOURCE_OCR, ocr_langs[i], text))
+
+    return ExtractedText.from_pages(pages), valid_ocr_pages
+
+
+def document_language(extracted, default='en'):
+    return dominant_language(
+        {s.page: s.lang for s in extracted.segments},
+        weights={s.page: s.end - s.start for s in extracted.segments},
+        default=default,
+    )
+
+
+def _engine(lang, engine):
+    return engine if isinstance(engine, TtsEngine) else select_engine(lang, engine)
+
+
+def synthesize_sections(sections, lang="en", engine=None, max_workers=None, on_chunk=None):
+    """
+    engine is a TtsEngine or an engine name; None picks the configured engine for lang.
+    max_workers defaults to what the engine can use. stats["format"] is "mp3" or "wav".
+    """
+    engine = _engine(lang, engine)
+    audio, stats = synthesize_chunks(
+        split_sections(sections),
+        lang=lang,
+        synthesize=cached_synthesizer(engine.synthesize, engine.cache_name),
+        max_workers=max_workers or engine.max_workers,
+        on_chunk=on_chunk,
+        audio_format=engine.format,
+    )
+    stats["engine"] = engine.name
+    return audio, stats
+
+
+def sections_playlist_dir(sections, lang="en", engine=None):
+    """Where the segmented audio for these sections, language and engine lives on disk."""
+    engine = _engine(lang, engine)
+    return playlist_dir(make_key("sections", engine.cache_name, lang, *sections))
+
+
+def synthesize_sections_to_playlist(sections, directory, lang="en", engine=None, max_workers=None,
+                                    on_chunk=None, on_segment=None, chunks=None):
+    """
+    Like synthesize_sections, but the audio goes to segment files on disk; returns (AudioPlaylist, stats).
+
+    chunks is split_sections(sections), for callers that have already split them.
+    """
+    engine = _engine(lang, engine)
+    playlist, stats = write_playlist(
+        directory,
+        split_sections(sections) if chunks is None else chunks,
+        lang=lang,
+        synthesize=cached_synthesizer(engine.synthesize, engine.cache_name),
+        audio_format=engine.format,
+        max_workers=max_workers or engine.max_workers,
+        on_chunk=on_chunk,
+        on_segment=on_segment,
+    )
+    stats["engine"] = engine.name
+    return playlist, stats
@@ -2,16 +2,28 @@ import streamlit as st
 import os
 import shutil
 import tempfile
-import base64
-import uuid
-import pandas as pd
-from langdetect import detect
-from PyPDF2 import PdfReader
-from gtts import gTTS
-from docx import Document as DocxDocument
-from langchain_community.llms import Ollama
-from langchain.chains.question_answering import load_qa_chain
-from langchain.docstore.document import Document
+from types import SimpleNamespace
+import doc_loaders
+import language
+import tts_pipeline
+from tts_pipeline import split_text
+from tts_engines import available_engines, get_engine, select_engine
+from audio_segments import AudioPlaylist, playlist_dir, write_playlist
+from audio_player import render_playlist
+from audio_cache import cached_synthesizer
+from doc_loaders import extract_chunks_from_file as read_file_chunks
+from folder_index import FolderIndex
+from search_index import FolderSearchIndex
+from language import detect_language
+from retrieval import ChunkRetriever, HashingEmbedder, OllamaEmbedder
+from dedup import dedup_chunks
+from llm_client import OllamaClient, build_qa_prompt
+from answer_cache import AnswerCache, documents_fingerprint, normalize_question
+from disk_cache import hash_bytes, make_key
+from jobs import DONE
+from job_ui import forget_job, job_progress, start_job, tracked_job
+from diagnostics import finish_rerun_profile, render_diagnostics_panel, rerun, start_rerun_profile
+from warmup import warm_up_in_background
 
 # === Updated Custom CSS with Centered Chat and No Spacing ===
 st.markdown("""
@@ -155,27 +167,36 @@ if "question" not in st.session_state:
     st.session_state.question = ""
 if "file_preview" not in st.session_state:
     st.session_state.file_preview = ""
+if "file_chunks" not in st.session_state:
+    st.session_state.file_chunks = []
 if "uploaded_file" not in st.session_state:
     st.session_state.uploaded_file = None
 if "selected_files" not in st.session_state:
     st.session_state.selected_files = []
 if "folder_path" not in st.session_state:
     st.session_state.folder_path = r"YourFolderPath"
+if "last_llm_metrics" not in st.session_state:
+    st.session_state.last_llm_metrics = None
+if "ingest_report" not in st.session_state:
+    st.session_state.ingest_report = []
+if "last_dedup" not in st.session_state:
+    st.session_state.last_dedup = None
+if "answer_audio" not in st.session_state:
+    st.session_state.answer_audio = None
 
 # === Helper Functions ===
-def play_gtts(text, lang_code="en"):
-    try:
-        tts = gTTS(text=text, lang=lang_code)
-        tmp_file_path = os.path.join(tempfile.gettempdir(), f"{uuid.uuid4()}.mp3")
-        tts.save(tmp_file_path)
-        with open(tmp_file_path, "rb") as audio_file:
-            audio_data = audio_file.read()
-        st.audio(audio_data, format="audio/mp3")
-        b64 = base64.b64encode(audio_data).decode()
-        href = f'<a href="data:audio/mp3;base64,{b64}" download="audio.mp3" class="stButton">⬇️ Download Audio</a>'
-        st.markdown(href, unsafe_allow_html=True)
-    except Exception as e:
-        st.error(f"❌ TTS failed: {e}")
+def synthesize_answer(text, lang_code="en", engine=None):
+    # Audio is written to segment files on disk; only the directory is kept in the session
+    engine = select_engine(lang_code, engine)
+    playlist, _ = write_playlist(
+        playlist_dir(make_key("answer", engine.cache_name, lang_code, text)),
+        split_text(text),
+        lang=lang_code,
+        synthesize=cached_synthesizer(engine.synthesize, engine.cache_name),
+        audio_format=engine.format,
+        max_workers=engine.max_workers,
+    )
+    return playlist.directory
 
 def get_file_icon(ext):
     icons = {
@@ -187,34 +208,131 @@ def get_file_icon(ext):
     }
     return icons.get(ext.lower(), "📁")
 
-def extract_text_from_file(filepath):
+def extract_file_chunks(filepath):
     try:
-        ext = os.path.splitext(filepath)[1].lower()
-        if ext == ".pdf":
-            with open(filepath, "rb") as f:
-                reader = PdfReader(f)
-                return "\n".join([p.extract_text() or "" for p in reader.pages])
-        elif ext == ".docx":
-            doc = DocxDocument(filepath)
-            return "\n".join([p.text for p in doc.paragraphs])
-        elif ext == ".txt":
-            with open(filepath, "r", encoding="utf-8") as f:
-                return f.read()
-        elif ext in [".csv", ".xlsx"]:
-            if ext == ".csv":
-                df = pd.read_csv(filepath)
-            else:
-                df = pd.read_excel(filepath)
-            return df.to_string(index=False)
+        return read_file_chunks(filepath)
     except Exception as e:
         st.warning(f"⚠️ Could not read {filepath}: {e}")
-    return ""
-
-def load_doc(filepath):
-    text = extract_text_from_file(filepath)
-    if text.strip():
-        return Document(page_content=text, metadata={"source": os.path.basename(filepath)})
-    return None
+    return "", []
+
+@st.cache_resource
+def get_folder_index():
+    return FolderIndex()
+
+def ingest_selected(folder_path, filenames):
+    """
+    Extract the selected files across worker processes, showing progress as each finishes.
+    Returns (file_keys, report); report lists files that failed, timed out or were slow.
+    """
+    paths = {os.path.abspath(os.path.join(folder_path, f)): f for f in filenames}
+    hashes, report = {}, []
+    progress = st.progress(0.0, text="📄 Reading files...")
+    for n, entry in enumerate(get_folder_index().ingest(paths), 1):
+        fname = paths[entry["path"]]
+        progress.progress(n / len(paths), text=f"📄 {n}/{len(paths)} files ready ({fname})")
+        if entry["error"] or entry["seconds"] >= SLOW_FILE_SECONDS:
+            report.append({
+                "file": fname,
+                "status": entry["status"],
+                "seconds": round(entry["seconds"], 1),
+                "error": entry["error"] or "",
+            })
+        if not entry["error"] and entry["text"].strip():
+            hashes[fname] = entry["sha256"]
+    progress.empty()
+    return [(f, hashes[f]) for f in filenames if f in hashes], report
+
+def build_retriever(chunks, metadatas, retrieval_mode):
+    # Copies of the same content (drafts, PDF and DOCX exports) are indexed once; metadata["sources"] lists them all
+    chunks, metadatas, dedup_stats = dedup_chunks(chunks, metadatas)
+    embedder = None
+    if retrieval_mode == "hybrid":
+        embedder = HashingEmbedder()
+    elif retrieval_mode == "ollama":
+        embedder = OllamaEmbedder()
+    return ChunkRetriever(chunks, metadatas, embedder=embedder), dedup_stats
+
+@st.cache_resource(max_entries=8)
+def get_folder_retriever(folder_path, file_keys, retrieval_mode):
+    # file_keys holds (filename, sha256) pairs, so edited files get a fresh retriever
+    chunks, metadatas = [], []
+    for fname, _ in file_keys:
+        entry = get_folder_index().get(os.path.join(folder_path, fname))
+        # The file may have vanished or failed since it was listed
+        if entry is None or entry["error"]:
+            continue
+        for i, chunk in enumerate(entry["chunks"]):
+            chunks.append(chunk)
+            metadatas.append({"source": fname, "chunk": i})
+    return build_retriever(chunks, metadatas, retrieval_mode)
+
+@st.cache_resource(max_entries=4)
+def get_text_retriever(chunks, source, retrieval_mode):
+    return build_retriever(chunks, [{"source": source, "chunk": i} for i in range(len(chunks))], retrieval_mode)
+
+@st.cache_resource
+def warm_up():
+    # Once per server process, off the script thread: langdetect profiles, loader and gTTS imports
+    get_llm_client()
+    return warm_up_in_background(
+        ("langdetect", language.warm_up),
+        ("loaders", doc_loaders.warm_up),
+        ("gtts", tts_pipeline.warm_up),
+    )
+
+@st.cache_resource
+def get_llm_client():
+    # Shared by every session; warm-up loads the model while the first page renders
+    client = OllamaClient(model="llama3")
+    client.warm_up_async()
+    return client
+
+@st.cache_resource
+def get_folder_search_index(folder_path):
+    return FolderSearchIndex()
+
+def search_folder(folder_path, filenames, query):
+    # Only files that are already indexed are searchable; the rest join once extraction finishes
+    index = get_folder_index()
+    hashes = index.hashes(os.path.join(folder_path, f) for f in filenames)
+    search = get_folder_search_index(folder_path)
+    search.sync(
+        {os.path.basename(path): sha256 for path, sha256 in hashes.items()},
+        lambda name: index.text(os.path.join(folder_path, name)),
+    )
+    return search.counts(query)
+
+@st.cache_resource
+def get_answer_cache():
+    return AnswerCache(max_entries=1024, ttl=7 * 24 * 3600)
+
+def run_answer(job, client, prompt, answer_cache, fingerprint, question):
+    # Runs on the shared job pool, so the answer is cached even if the asking session goes away
+    answer = ""
+    metrics = {}
+    for piece in client.stream(prompt, metrics=metrics):
+        job.check_cancelled()
+        answer += piece
+        job.update(partial=answer, message=f"{len(answer)} chars")
+    answer_cache.put(fingerprint, question, answer)
+    return answer, metrics
+
+def add_answer(question, answer):
+    st.session_state.chat_history.append(("Slim", question))
+    st.session_state.chat_history.append(("Django", answer))
+    st.session_state.last_answer = answer
+    st.session_state.play_audio = False
+    st.session_state.answer_audio = None
+    st.session_state.question = question
+
+RETRIEVAL_MODES = {
+    "Hybrid (BM25 + local embeddings)": "hybrid",
+    "Keyword only (BM25)": "bm25",
+    "Hybrid (BM25 + Ollama embeddings)": "ollama",
+}
+TOP_K_CHUNKS = 8
+SLOW_FILE_SECONDS = 10
+CONTEXT_TOKEN_BUDGET = 3000
 
 # === Page Setup ===
 st.set_page_config(
@@ -223,6 +341,8 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+start_rerun_profile()
+warm_up()
 
 # === Sidebar - Setup Controls ===
 with st.sidebar:
@@ -251,7 +371,7 @@ with st.sidebar:
                     dest_path = os.path.join(folder_path, os.path.basename(file_path_input))
                     shutil.copy(file_path_input, dest_path)
                     st.success(f"✅ Added: {os.path.basename(file_path_input)}")
-                    st.rerun()
+                    rerun()
                 except Exception as e:
                     st.error(f"❌ Failed to copy file: {e}")
             else:
@@ -263,14 +383,32 @@ with st.sidebar:
                                       placeholder="Enter keyword",
                                       key="filter_keyword")
         
-        file_exts = (".pdf", ".docx", ".txt", ".csv", ".xlsx")
-        all_files = sorted([
-            f for f in os.listdir(folder_path)
-            if f.lower().endswith(file_exts) and os.path.isfile(os.path.join(folder_path, f))
-        ])
+        all_files = FolderIndex.list_files(folder_path)
+
+        # Extract new or changed files in the background so questions only read the index
+        folder_index = get_folder_index()
+        folder_index.refresh(os.path.join(folder_path, f) for f in all_files)
+        index_status = folder_index.status()
+        if index_status["pending"]:
+            st.caption(f"⏳ Indexing {index_status['pending']} file(s) in the background...")
         
         filtered_files = [f for f in all_files if filter_keyword.lower() in f.lower()] if filter_keyword else all_files
         
+        content_query = st.text_input("Search file contents:",
+                                      placeholder="Word or phrase",
+                                      key="content_query")
+        if content_query.strip():
+            content_counts = search_folder(folder_path, all_files, content_query)
+            filtered_files = sorted(
+                (f for f in filtered_files if f in content_counts),
+                key=lambda f: -content_counts[f],
+            )
+            for f in filtered_files[:10]:
+                st.caption(f"{get_file_icon(os.path.splitext(f)[1])} {f} — {content_counts[f]} match(es)")
+        
+        # Keep earlier selections valid even when they are filtered out
+        filtered_files += [f for f in st.session_state.selected_files if f in all_files and f not in filtered_files]
+        
         st.markdown(f"**Available Files** ({len(filtered_files)} documents)")
         selected_files = st.multiselect("Select files to analyze:", 
                                        filtered_files, 
@@ -292,21 +430,51 @@ with st.sidebar:
                                             key="file_uploader")
             
             if uploaded_file:
-                # Save to temp file
-                file_path = os.path.join(tempfile.gettempdir(), uploaded_file.name)
-                with open(file_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-                
-                # Extract content
-                content = extract_text_from_file(file_path)
-                st.session_state.file_preview = content
+                # Extract each upload once, not on every rerun; large CSV/XLSX files are slow to stream
+                if st.session_state.get("upload_file_id") != uploaded_file.file_id:
+                    # Save to temp file
+                    file_path = os.path.join(tempfile.gettempdir(), uploaded_file.name)
+                    with open(file_path, "wb") as f:
+                        f.write(uploaded_file.getbuffer())
+
+                    # Extract content
+                    content, chunks = extract_file_chunks(file_path)
+                    st.session_state.file_preview = content
+                    st.session_state.file_chunks = chunks
+                    st.session_state.upload_file_id = uploaded_file.file_id
                 st.session_state.uploaded_file = uploaded_file
             else:
                 st.session_state.uploaded_file = None
+                st.session_state.upload_file_id = None
     
     # Settings
     with st.expander("⚙️ Settings", expanded=False):
         st.info("Using Ollama with llama3 model")
+        retrieval_label = st.selectbox("Retrieval mode:", list(RETRIEVAL_MODES.keys()), key="retrieval_mode")
+        retrieval_mode = RETRIEVAL_MODES[retrieval_label]
+        answer_similarity = st.slider(
+            "Reuse cached answers for similar questions (1.0 = exact match only):",
+            min_value=0.50, max_value=1.0, value=1.0, step=0.01,
+            key="answer_similarity",
+        )
+        st.selectbox(
+            "Voice engine:",
+            [None] + available_engines(),
+            format_func=lambda name: "Auto" if name is None else get_engine(name).label,
+            key="tts_engine",
+        )
+        metrics = st.session_state.last_llm_metrics
+        if metrics and metrics["time_to_first_token"] is not None:
+            st.caption(
+                f"Last answer: first token after {metrics['time_to_first_token']:.2f}s, "
+                f"{metrics['tokens_per_second']:.1f} tokens/s, {metrics['total_seconds']:.1f}s total"
+            )
+        dedup = st.session_state.last_dedup
+        if dedup and dedup["chunks"]:
+            st.caption(
+                f"Duplicates: {dedup['removed']} of {dedup['chunks']} chunks ({dedup['ratio']:.0%}) "
+                f"collapsed, ~{dedup['tokens_before'] - dedup['tokens_after']:,} tokens fewer to search"
+            )
         if st.button("🧹 Clear Chat History", use_container_width=True):
             st.session_state.chat_history = []
             st.session_state.last_answer = ""
@@ -337,39 +505,69 @@ with col1:
     if st.button("🤖 Ask Question", use_container_width=True) and question.strip():
         with st.spinner("🧠 Analyzing documents..."):
             docs = []
+            retriever = None
+            dedup_stats = None
+            file_keys = []
             
             if mode == "📤 Single File Mode" and st.session_state.uploaded_file:
                 # Process single file
-                doc = Document(page_content=st.session_state.file_preview)
-                if doc:
-                    docs.append(doc)
+                file_keys.append((
+                    st.session_state.uploaded_file.name,
+                    hash_bytes(st.session_state.file_preview.encode("utf-8")),
+                ))
+                retriever, dedup_stats = get_text_retriever(
+                    tuple(st.session_state.file_chunks),
+                    st.session_state.uploaded_file.name,
+                    retrieval_mode,
+                )
             elif mode == "📂 Folder Mode" and st.session_state.selected_files:
-                # Process folder files
-                for fname in st.session_state.selected_files:
-                    path = os.path.join(st.session_state.folder_path, fname)
-                    doc = load_doc(path)
-                    if doc:
-                        docs.append(doc)
+                # Files are extracted in parallel with per-file limits; unreadable ones are reported, not waited on
+                file_keys, st.session_state.ingest_report = ingest_selected(
+                    st.session_state.folder_path, st.session_state.selected_files
+                )
+                retriever, dedup_stats = get_folder_retriever(st.session_state.folder_path, tuple(file_keys), retrieval_mode)
+            st.session_state.last_dedup = dedup_stats
             
-            if docs:
-                try:
-                    llm = Ollama(model="llama3")
-                    chain = load_qa_chain(llm, chain_type="stuff")
-                    answer = chain.run(input_documents=docs, question=question)
-
-                    st.session_state.chat_history.append(("Slim", question))
-                    st.session_state.chat_history.append(("Django", answer))
-                    st.session_state.last_answer = answer
-                    st.session_state.play_audio = False
-                    st.session_state.question = question
-                    
-                    # Rerun to update UI
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"❌ Error: {e}")
+            # Content hashes are part of the fingerprint, so edited files never hit stale answers
+            fingerprint = documents_fingerprint(file_keys, retrieval_mode, get_llm_client().model)
+            answer_cache = get_answer_cache()
+            cached_answer = answer_cache.get(fingerprint, question, similarity=answer_similarity) if file_keys else None
+            
+            # Only the most relevant chunks within the token budget reach the LLM
+            if retriever is not None and cached_answer is None:
+                # build_qa_prompt only reads .page_content, so langchain's Document isn't needed
+                for chunk, metadata, _ in retriever.search(question, k=TOP_K_CHUNKS, token_budget=CONTEXT_TOKEN_BUDGET):
+                    docs.append(SimpleNamespace(page_content=chunk, metadata=metadata))
+            
+            if cached_answer is not None:
+                add_answer(question, cached_answer)
+                rerun()
+            elif docs:
+                # Generation runs as a background job; identical questions from other sessions share it
+                start_job(
+                    "answer_job", "answer", (fingerprint, normalize_question(question)), run_answer,
+                    get_llm_client(), build_qa_prompt(docs, question), answer_cache, fingerprint, question,
+                )
+                st.session_state.pending_question = question
             else:
                 st.warning("⚠️ No valid documents to analyze")
 
+    answer_job = tracked_job("answer_job")
+    if answer_job is not None and job_progress("answer_job", answer_job, "🧠 Generating answer...", render_partial=st.markdown):
+        forget_job("answer_job")
+        if answer_job.state == DONE:
+            answer, st.session_state.last_llm_metrics = answer_job.result
+            add_answer(st.session_state.pending_question, answer)
+            rerun()
+        else:
+            st.error(f"❌ Error: {answer_job.error or answer_job.state}")
+
+    if st.session_state.ingest_report and mode == "📂 Folder Mode":
+        report = st.session_state.ingest_report
+        failed = sum(1 for r in report if r["error"])
+        with st.expander(f"📄 {failed} file(s) skipped, {len(report) - failed} slow"):
+            st.dataframe(report, hide_index=True, use_container_width=True)
+
 with col2:
     if st.session_state.last_answer:
         if st.button("🔊 Read Answer Aloud", use_container_width=True):
@@ -412,14 +610,18 @@ st.markdown('</div>', unsafe_allow_html=True)  # Close main-container
 
 # Audio player
 if st.session_state.play_audio and st.session_state.last_answer:
+    lang_code = detect_language(st.session_state.last_answer, default="en")
+    try:
+        st.session_state.answer_audio = synthesize_answer(
+            st.session_state.last_answer, lang_code=lang_code, engine=st.session_state.get("tts_engine")
+        )
+    except Exception as e:
+        st.error(f"❌ TTS failed: {e}")
+    st.session_state.play_audio = False
+if st.session_state.answer_audio:
     with st.container():
         st.subheader("🔊 Audio Response")
-        try:
-            lang_code = detect(st.session_state.last_answer)
-        except:
-            lang_code = "en"
-        play_gtts(st.session_state.last_answer, lang_code=lang_code)
-        st.session_state.play_audio = False
+        render_playlist(AudioPlaylist(st.session_state.answer_audio), "answer_audio", stem="answer")
 
 # File preview section
 if (mode == "📤 Single File Mode" and st.session_state.uploaded_file) or \
@@ -447,3 +649,6 @@ if (mode == "📤 Single File Mode" and st.session_state.uploaded_file) or \
             file_ext = os.path.splitext(file)[1].lower()
             file_icon = get_file_icon(file_ext)
             st.markdown(f"- {file_icon} {file}")
+
+finish_rerun_profile()
+render_diagnostics_panel()
@@ -0,0 +1,194 @@
+"""
+Headless batch PDF -> audiobook conversion.
+
+    python batch_convert.py ./books --out ./audiobooks --workers 4
+    python batch_convert.py ./books --out ./audiobooks --tts espeak --workers 2 --tts-workers 4
+    python batch_convert.py manifest.txt --out ./audiobooks --tts silent
+
+Each document gets a <name>.checkpoint.json next to its outputs; rerunning the same
+command skips finished documents and resumes extracted ones at the TTS stage.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from audiobook import document_language, extract_text_from_pdf, synthesize_sections_to_playlist
+from disk_cache import hash_file
+from ocr_engine import process_context
+from pdf_document import PdfDocument
+from tts_engines import ENGINES, get_engine
+from tts_pipeline import PAGE_MARKER_RE
+
+
+def collect_inputs(source):
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(root, name)
+            for root, _, files in os.walk(source)
+            for name in files
+            if name.lower().endswith(".pdf")
+        )
+    # Manifest: one PDF path per line, relative to the manifest's folder
+    base = os.path.dirname(os.path.abspath(source))
+    paths = []
+    with open(source, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                paths.append(line if os.path.isabs(line) else os.path.join(base, line))
+    return paths
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    mode = "wb" if isinstance(data, bytes) else "w"
+    with open(tmp_path, mode, **({} if mode == "wb" else {"encoding": "utf-8"})) as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _load_checkpoint(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def convert_document(pdf_path, out_dir, lang=None, tts="gtts", tts_workers=None):
+    """Convert one PDF, checkpointing after extraction and after synthesis. Runs in a worker process."""
+    sha256 = hash_file(pdf_path)
+    stem = f"{os.path.splitext(os.path.basename(pdf_path))[0]}-{sha256[:8]}"
+    checkpoint_path = os.path.join(out_dir, f"{stem}.checkpoint.json")
+    text_path = os.path.join(out_dir, f"{stem}.txt")
+    engine = get_engine(tts)
+    audio_path = os.path.join(out_dir, f"{stem}.{engine.format}")
+
+    checkpoint = _load_checkpoint(checkpoint_path)
+    if checkpoint is None or checkpoint.get("sha256") != sha256:
+        checkpoint = {"source": os.path.abspath(pdf_path), "sha256": sha256, "stage": "new"}
+    if checkpoint["stage"] == "done":
+        return dict(checkpoint, skipped=True)
+    checkpoint.pop("error", None)
+
+    try:
+        if checkpoint["stage"] != "extracted" or not os.path.exists(text_path):
+            start = time.perf_counter()
+            document = PdfDocument.from_path(pdf_path, sha256=sha256)
+            # Parallelism comes from the document pool, so OCR stays in-process
+            ocr_report = {}
+            extracted, ocr_pages = extract_text_from_pdf(
+                document,
+                range(1, document.page_count + 1),
+                ocr_workers=1,
+                on_ocr_page=lambda r: ocr_report.__setitem__(r.page, r.as_dict()),
+            )
+            _write_atomic(text_path, extracted.text)
+            checkpoint.update(
+                stage="extracted",
+                pages=document.page_count,
+                ocr_pages=len(ocr_pages),
+                ocr=[ocr_report[p] for p in sorted(ocr_report)],
+                lang=document_language(extracted),
+                extract_seconds=time.perf_counter() - start,
+                text_path=text_path,
+            )
+            _write_atomic(checkpoint_path, json.dumps(checkpoint, indent=2))
+
+        with open(text_path, "r", encoding="utf-8") as f:
+            sections = PAGE_MARKER_RE.split(f.read())
+        start = time.perf_counter()
+        # Segments go to disk as they are synthesized and are then streamed into one file,
+        # so a long book never has to fit in memory
+        segments_dir = os.path.join(out_dir, f"{stem}.segments")
+        playlist, stats = synthesize_sections_to_playlist(
+            sections,
+            segments_dir,
+            lang=lang or checkpoint.get("lang") or "en",
+            engine=engine,
+            max_workers=tts_workers,
+        )
+        playlist.export(audio_path)
+        shutil.rmtree(segments_dir, ignore_errors=True)
+        checkpoint.update(
+            stage="done",
+            tts_seconds=time.perf_counter() - start,
+            audio_seconds=playlist.total_seconds,
+            chunks=stats["chunks"],
+            engine=engine.name,
+            audio_path=audio_path,
+        )
+    except Exception as e:
+        checkpoint["error"] = f"{type(e).__name__}: {e}"
+    _write_atomic(checkpoint_path, json.dumps(checkpoint, indent=2))
+    return checkpoint
+
+
+def summarize(results, wall_seconds):
+    done = [r for r in results if r.get("stage") == "done" and not r.get("skipped")]
+    pages = sum(r.get("pages", 0) for r in done)
+    extract_seconds = sum(r.get("extract_seconds", 0.0) for r in done)
+    audio_seconds = sum(r.get("audio_seconds", 0.0) for r in done)
+    tts_seconds = sum(r.get("tts_seconds", 0.0) for r in done)
+    return {
+        "documents": len(results),
+        "converted": len(done),
+        "skipped": sum(1 for r in results if r.get("skipped")),
+        "failed": sum(1 for r in results if r.get("error")),
+        "pages": pages,
+        "ocr_pages": sum(r.get("ocr_pages", 0) for r in done),
+        "extract_pages_per_second": pages / extract_seconds if extract_seconds else 0.0,
+        "audio_seconds": audio_seconds,
+        "tts_audio_seconds_per_second": audio_seconds / tts_seconds if tts_seconds else 0.0,
+        "wall_seconds": wall_seconds,
+        "pages_per_wall_second": pages / wall_seconds if wall_seconds else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a folder or manifest of PDFs to MP3 audiobooks.")
+    parser.add_argument("source", help="Folder to scan for PDFs, or a manifest file with one path per line")
+    parser.add_argument("--out", required=True, help="Output folder for text, audio and checkpoint files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Documents converted in parallel")
+    parser.add_argument("--tts-workers", type=int, help="Concurrent TTS chunks per document (default: per engine)")
+    parser.add_argument("--tts", choices=sorted(ENGINES), default="gtts", help="TTS engine; espeak and pyttsx3 run offline")
+    parser.add_argument("--lang", help="TTS language code; detected per document when omitted")
+    parser.add_argument("--report", help="Write the throughput report to this JSON file")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    inputs = collect_inputs(args.source)
+    if not inputs:
+        print("No PDFs found.", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=max(1, args.workers), mp_context=process_context()) as pool:
+        futures = {
+            pool.submit(convert_document, path, args.out, args.lang, args.tts, args.tts_workers): path
+            for path in inputs
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"source": path, "error": f"{type(e).__name__}: {e}"}
+            results.append(result)
+            status = "skipped" if result.get("skipped") else ("failed: " + result["error"]) if result.get("error") else "done"
+            print(f"[{len(results)}/{len(inputs)}] {os.path.basename(path)}: {status}", flush=True)
+
+    report = summarize(results, time.perf_counter() - start)
+    print(json.dumps(report, indent=2))
+    if args.report:
+        _write_atomic(args.report, json.dumps(report, indent=2))
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
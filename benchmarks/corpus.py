@@ -0,0 +1,92 @@
+import os
+import random
+
+from fpdf import FPDF
+from PIL import Image, ImageDraw, ImageFont
+
+WORDS = (
+    "the report shows revenue growth across regions while costs remained stable and the team "
+    "delivered new features for customers reading documents aloud in several languages with "
+    "better accuracy faster response times and lower infrastructure spending this quarter"
+).split()
+
+
+def sentences(rng, count, words_per_sentence=14):
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(words_per_sentence)).capitalize() + "."
+        for _ in range(count)
+    ]
+
+
+def make_text_pdf(path, pages, rng, sentences_per_page=12):
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=False)
+    for page in range(pages):
+        pdf.add_page()
+        pdf.set_font("Helvetica", size=11)
+        pdf.multi_cell(0, 6, f"Page {page + 1}. " + " ".join(sentences(rng, sentences_per_page)))
+    pdf.output(path)
+    return path
+
+
+def make_image_pdf(path, pages, rng, sentences_per_page=6):
+    """PDF whose pages are plain images of text, so only the OCR path can read them."""
+    font = ImageFont.load_default()
+    pdf = FPDF()
+    for page in range(pages):
+        img = Image.new("L", (1240, 1754), color=255)
+        draw = ImageDraw.Draw(img)
+        y = 100
+        for sentence in sentences(rng, sentences_per_page, words_per_sentence=8):
+            draw.text((100, y), sentence, fill=0, font=font)
+            y += 40
+        image_path = f"{path}.{page}.png"
+        img.save(image_path)
+        pdf.add_page()
+        pdf.image(image_path, x=0, y=0, w=210, h=297)
+        os.remove(image_path)
+    pdf.output(path)
+    return path
+
+
+def make_folder(folder, files_per_type, rng, rows=500):
+    """DOCX/CSV/XLSX/TXT/PDF files like the ones Ask-your-Folder reads."""
+    import pandas as pd
+    from docx import Document as DocxDocument
+
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for n in range(files_per_type):
+        doc = DocxDocument()
+        for sentence in sentences(rng, 40):
+            doc.add_paragraph(sentence)
+        paths.append(os.path.join(folder, f"memo_{n}.docx"))
+        doc.save(paths[-1])
+
+        df = pd.DataFrame({
+            "region": [rng.choice(["north", "south", "east", "west"]) for _ in range(rows)],
+            "revenue": [round(rng.uniform(1000, 9000), 2) for _ in range(rows)],
+            "units": [rng.randint(1, 500) for _ in range(rows)],
+        })
+        paths.append(os.path.join(folder, f"sales_{n}.csv"))
+        df.to_csv(paths[-1], index=False)
+        paths.append(os.path.join(folder, f"sales_{n}.xlsx"))
+        df.to_excel(paths[-1], index=False)
+
+        paths.append(os.path.join(folder, f"notes_{n}.txt"))
+        with open(paths[-1], "w", encoding="utf-8") as f:
+            f.write("\n".join(sentences(rng, 60)))
+
+        paths.append(make_text_pdf(os.path.join(folder, f"report_{n}.pdf"), 5, rng))
+    return paths
+
+
+def make_corpus(root, seed=0, text_pages=50, image_pages=3, files_per_type=3):
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    return {
+        "text_pdf": make_text_pdf(os.path.join(root, "text.pdf"), text_pages, rng),
+        "image_pdf": make_image_pdf(os.path.join(root, "scanned.pdf"), image_pages, rng),
+        "folder": os.path.join(root, "folder"),
+        "folder_files": make_folder(os.path.join(root, "folder"), files_per_type, rng),
+    }
@@ -0,0 +1,99 @@
+"""
+Minimal HTTP stand-in for the Ollama API, for benchmarks and local runs without a model server.
+
+    python benchmarks/ollama_stub.py --port 11434
+
+Supports streamed and non-streamed POST /api/generate and POST /api/embeddings.
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_ANSWER = "This is a stub answer generated from the provided context."
+
+
+class OllamaStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    token_delay = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        request = self._read_json()
+        if self.path == "/api/embeddings":
+            digest = hashlib.sha256(request.get("prompt", "").encode("utf-8")).digest()
+            self._send_json({"embedding": [b / 255.0 for b in digest]})
+            return
+        if self.path != "/api/generate":
+            self.send_error(404)
+            return
+
+        prompt = request.get("prompt", "")
+        if not prompt:
+            # Warm-up request: load the model, generate nothing
+            self._send_json({"model": request.get("model"), "response": "", "done": True})
+            return
+        words = STUB_ANSWER.split(" ")
+        if not request.get("stream", True):
+            self._send_json({"response": STUB_ANSWER, "done": True, "eval_count": len(words)})
+            return
+
+        start = time.perf_counter()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, word in enumerate(words):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            self._write_chunk({"response": word if i == 0 else " " + word, "done": False})
+        self._write_chunk({
+            "response": "",
+            "done": True,
+            "prompt_eval_count": len(prompt) // 4,
+            "eval_count": len(words),
+            "eval_duration": int((time.perf_counter() - start) * 1e9),
+        })
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, payload):
+        line = (json.dumps(payload) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(line):X}\r\n".encode("ascii") + line + b"\r\n")
+        self.wfile.flush()
+
+
+def start_stub(port=0, token_delay=0.0):
+    """Start the stub on a background thread; returns (server, base_url)."""
+    handler = type("Handler", (OllamaStubHandler,), {"token_delay": token_delay})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, name="ollama-stub", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed tokens")
+    args = parser.parse_args()
+    server, url = start_stub(args.port, args.token_delay)
+    print(f"Ollama stub listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
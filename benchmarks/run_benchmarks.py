@@ -0,0 +1,292 @@
+"""
+Benchmarks for the PDF, OCR, language, export, TTS and Ask-your-Folder QA stages,
+plus cold-start and rerun timings of both Streamlit apps (see startup.py).
+
+    python benchmarks/run_benchmarks.py --out bench.json
+    python benchmarks/run_benchmarks.py --out new.json --baseline bench.json
+
+Everything runs locally on a generated corpus: TTS uses the silent stand-in synthesizer
+and QA talks to benchmarks/ollama_stub.py. Each installed offline TTS engine also gets a
+tts_engine.<name> stage; --tts-online adds gTTS, which needs network access. With --baseline the exit code is 1 when a
+stage regresses past the limits in benchmarks/thresholds.json.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+
+def time_stage(fn, repeat, setup=None):
+    timings = []
+    extra = {}
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+        if isinstance(result, dict):
+            extra = result
+    return dict(
+        extra,
+        runs=repeat,
+        median_seconds=statistics.median(timings),
+        min_seconds=min(timings),
+    )
+
+
+def run(work_dir, repeat, tts_online=False):
+    # Caches must live in the scratch folder, so set this before importing the app modules
+    os.environ["TAKTAK_CACHE_DIR"] = os.path.join(work_dir, "cache")
+
+    from audiobook import (
+        detect_content_language,
+        extract_text_from_pdf,
+        extract_text_with_ocr,
+        shared_text_cache,
+        synthesize_sections,
+    )
+    from audio_cache import shared_audio_cache
+    from corpus import make_corpus
+    from dedup import dedup_chunks
+    from doc_loaders import chunk_text, extract_text_from_file
+    from ingest import extract_files
+    from llm_client import OllamaClient, build_qa_prompt
+    from ocr_engine import available_cores
+    from ollama_stub import start_stub
+    from pdf_document import PdfDocument
+    from pdf_export import export_text_to_pdf
+    from retrieval import ChunkRetriever, HashingEmbedder
+    from startup import APP_IMPORTS, measure_in_subprocess
+    from tts_engines import SilentEngine, available_engines, get_engine
+    from tts_pipeline import audio_duration
+
+    corpus = make_corpus(os.path.join(work_dir, "corpus"))
+    text_cache = shared_text_cache()
+    stages = {}
+
+    document = PdfDocument.from_path(corpus["text_pdf"])
+    all_pages = list(range(1, document.page_count + 1))
+
+    def clear_text_cache():
+        text_cache.clear()
+        document._text.clear()
+
+    stages["extract_text_from_pdf"] = time_stage(
+        lambda: {"pages": len(extract_text_from_pdf(document, all_pages)[0])},
+        repeat,
+        setup=clear_text_cache,
+    )
+    stages["extract_text_from_pdf_cached"] = time_stage(
+        lambda: {"pages": len(extract_text_from_pdf(document, all_pages)[0])},
+        repeat,
+    )
+    extracted, _ = extract_text_from_pdf(document, all_pages)
+
+    if shutil.which("tesseract") and shutil.which("pdftoppm"):
+        scanned = PdfDocument.from_path(corpus["image_pdf"])
+        scanned_pages = list(range(1, scanned.page_count + 1))
+
+        def ocr(adaptive):
+            reports = []
+            extract_text_with_ocr(scanned, scanned_pages, lang="eng", adaptive=adaptive, on_page=reports.append)
+            return {
+                "pages": len(reports),
+                "mean_dpi": statistics.mean(r.dpi for r in reports),
+                "escalated_pages": sum(len(r.attempts) > 1 for r in reports),
+            }
+
+        # Fixed 300 dpi keeps the stage comparable with older baselines
+        stages["extract_text_with_ocr"] = time_stage(lambda: ocr(False), repeat, setup=text_cache.clear)
+        stages["extract_text_with_ocr_adaptive"] = time_stage(lambda: ocr(True), repeat, setup=text_cache.clear)
+    else:
+        stages["extract_text_with_ocr"] = {"skipped": "tesseract or poppler not installed"}
+        stages["extract_text_with_ocr_adaptive"] = {"skipped": "tesseract or poppler not installed"}
+
+    long_text = extracted.text * 20
+    stages["detect_content_language"] = time_stage(
+        lambda: {"chars": len(long_text), "lang": detect_content_language(long_text)},
+        repeat,
+        setup=text_cache.clear,
+    )
+
+    stages["export_text_to_pdf"] = time_stage(
+        lambda: {"bytes": len(export_text_to_pdf(extracted.text))},
+        repeat,
+    )
+
+    for ext in (".pdf", ".docx", ".txt", ".csv", ".xlsx"):
+        paths = [p for p in corpus["folder_files"] if p.endswith(ext)]
+        stages[f"extract_text_from_file{ext}"] = time_stage(
+            lambda paths=paths: {"files": len(paths), "chars": sum(len(extract_text_from_file(p)) for p in paths)},
+            repeat,
+        )
+
+    # Folder Mode extraction across worker processes; "parallel" should scale with the core count
+    tasks = [(p, None) for p in corpus["folder_files"]]
+    for label, workers in (("serial", 1), ("parallel", available_cores())):
+        stages[f"ingest_folder.{label}"] = time_stage(
+            lambda workers=workers: {
+                "files": len(tasks),
+                "workers": workers,
+                "failed": sum(1 for r in extract_files(tasks, workers=workers) if r.error),
+            },
+            repeat,
+        )
+
+    sections = [extracted.body(s) for s in extracted.segments]
+    audio_cache = shared_audio_cache()
+
+    def tts():
+        _, stats = synthesize_sections(sections, engine=SilentEngine(latency=0.01))
+        return {"chunks": stats["chunks"], "time_to_first_audio": stats["time_to_first_audio"]}
+
+    stages["synthesize_sections"] = time_stage(tts, repeat, setup=audio_cache.clear)
+
+    # Same few pages through every engine, uncached, so engines compare like for like
+    engine_sections = sections[:3]
+    for name in available_engines():
+        engine = get_engine(name)
+        if not engine.offline and not tts_online:
+            stages[f"tts_engine.{name}"] = {"skipped": "network engine, pass --tts-online"}
+            continue
+
+        def synthesize(engine=engine):
+            audio, stats = synthesize_sections(engine_sections, engine=engine)
+            seconds = audio_duration(audio, engine.format)
+            return {
+                "chunks": stats["chunks"],
+                "workers": engine.max_workers,
+                "time_to_first_audio": stats["time_to_first_audio"],
+                "chars_per_second": stats["chars_per_second"],
+                "audio_seconds": seconds,
+                "realtime_factor": seconds / stats["total_seconds"] if stats["total_seconds"] else 0.0,
+            }
+
+        stages[f"tts_engine.{name}"] = time_stage(synthesize, repeat, setup=audio_cache.clear)
+
+    server, base_url = start_stub()
+    try:
+        client = OllamaClient(base_url=base_url)
+        client.warm_up()
+        folder_texts = {p: extract_text_from_file(p) for p in corpus["folder_files"]}
+        chunks, metadatas = [], []
+        for path, text in folder_texts.items():
+            for i, chunk in enumerate(chunk_text(text)):
+                chunks.append(chunk)
+                metadatas.append({"source": os.path.basename(path), "chunk": i})
+
+        # The folder corpus holds CSV and XLSX copies of the same tables, so some chunks collapse
+        stages["dedup_chunks"] = time_stage(lambda: dedup_chunks(chunks, metadatas)[2], repeat)
+        chunks, metadatas, _ = dedup_chunks(chunks, metadatas)
+
+        class Doc:
+            def __init__(self, page_content):
+                self.page_content = page_content
+
+        def qa():
+            retriever = ChunkRetriever(chunks, metadatas, embedder=HashingEmbedder())
+            hits = retriever.search("How did revenue grow in the north region?", k=8, token_budget=3000)
+            prompt = build_qa_prompt([Doc(c) for c, _, _ in hits], "How did revenue grow in the north region?")
+            metrics = {}
+            client.generate(prompt, metrics=metrics)
+            return {
+                "chunks": len(chunks),
+                "prompt_chars": len(prompt),
+                "time_to_first_token": metrics["time_to_first_token"],
+            }
+
+        stages["qa"] = time_stage(qa, repeat)
+    finally:
+        server.shutdown()
+
+    # Cold start in a fresh interpreter per app; single sample, hence the looser thresholds
+    for app in APP_IMPORTS:
+        result = measure_in_subprocess(app, env=dict(os.environ))
+        name = os.path.splitext(app)[0]
+        for metric in ("imports", "first_run", "rerun"):
+            stages[f"startup.{name}.{metric}"] = {"runs": 1, "median_seconds": result[f"{metric}_seconds"]}
+
+    return stages
+
+
+def compare(stages, baseline, thresholds):
+    """Return a list of human-readable regressions."""
+    failures = []
+    default_ratio = thresholds.get("default_max_regression", 1.5)
+    noise_floor = thresholds.get("noise_floor_seconds", 0.02)
+    for name, result in stages.items():
+        if "median_seconds" not in result:
+            continue
+        limits = thresholds.get("stages", {}).get(name, {})
+        current = result["median_seconds"]
+        max_seconds = limits.get("max_seconds")
+        if max_seconds is not None and current > max_seconds:
+            failures.append(f"{name}: {current:.4f}s exceeds the {max_seconds:.4f}s limit")
+        previous = baseline.get("stages", {}).get(name, {}).get("median_seconds")
+        if previous is None or max(current, previous) < noise_floor:
+            continue
+        ratio = current / previous if previous else float("inf")
+        max_ratio = limits.get("max_regression", default_ratio)
+        if ratio > max_ratio:
+            failures.append(f"{name}: {previous:.4f}s -> {current:.4f}s ({ratio:.2f}x, limit {max_ratio:.2f}x)")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the local benchmark suite.")
+    parser.add_argument("--out", default="bench_output.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", help="Earlier results to compare against")
+    parser.add_argument("--thresholds", default=os.path.join(HERE, "thresholds.json"))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--keep", action="store_true", help="Keep the generated corpus and caches")
+    parser.add_argument("--tts-online", action="store_true", help="Also benchmark gTTS (needs network access)")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="taktak-bench-")
+    try:
+        stages = run(work_dir, args.repeat, tts_online=args.tts_online)
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "stages": stages,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    for name, result in stages.items():
+        if "median_seconds" in result:
+            print(f"{name:36s} {result['median_seconds'] * 1000:10.1f} ms")
+        else:
+            print(f"{name:36s} skipped ({result.get('skipped')})")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.thresholds, "r", encoding="utf-8") as f:
+            thresholds = json.load(f)
+        failures = compare(stages, baseline, thresholds)
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Cold-start and rerun timings for the Streamlit entry points.
+
+    python benchmarks/startup.py streamlit_app.py ayf01.py
+
+Each app is measured in a fresh interpreter: "imports" is the time to import its
+modules before any script code runs, "first_run" the first full script run
+(what a new server pays), "warm_up" how long the background warm-up keeps running
+after that, and "rerun" the median of later runs (what every widget interaction
+pays). Scripts run headless through streamlit.testing.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+# Modules each entry point pulls in at import time
+APP_IMPORTS = {
+    "streamlit_app.py": [
+        "audiobook", "pdf_export", "pdf_document", "thumbnails", "search_index", "tts_engines",
+        "audio_segments", "audio_player", "diagnostics", "job_ui",
+    ],
+    "ayf01.py": [
+        "doc_loaders", "folder_index", "search_index", "language", "retrieval", "llm_client",
+        "answer_cache", "tts_pipeline", "tts_engines", "audio_cache", "audio_segments", "audio_player",
+        "diagnostics", "job_ui",
+    ],
+}
+
+
+def measure(app, reruns=5):
+    import streamlit  # noqa: F401  # paid by the server before any app code, so not counted
+    from streamlit.testing.v1 import AppTest
+
+    start = time.perf_counter()
+    for module in APP_IMPORTS.get(app, []):
+        __import__(module)
+    imports = time.perf_counter() - start
+
+    test = AppTest.from_file(os.path.join(ROOT, app), default_timeout=120)
+    start = time.perf_counter()
+    test.run()
+    first_run = time.perf_counter() - start
+    start = time.perf_counter()
+    for thread in threading.enumerate():
+        if thread.name == "warm-up":
+            thread.join()
+    warm_up = time.perf_counter() - start
+    timings = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        test.run()
+        timings.append(time.perf_counter() - start)
+    return {
+        "imports_seconds": imports,
+        "first_run_seconds": first_run,
+        "warm_up_seconds": warm_up,
+        "rerun_seconds": statistics.median(timings),
+        "errors": [str(e.value) for e in test.exception],
+    }
+
+
+def measure_in_subprocess(app, env=None):
+    """Run measure() for app in a fresh interpreter so nothing is imported yet."""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--json", app],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv and argv[0] == "--json":
+        sys.path.insert(0, ROOT)
+        os.chdir(ROOT)
+        print(json.dumps(measure(argv[1])))
+        return 0
+    for app in argv or list(APP_IMPORTS):
+        result = measure_in_subprocess(app)
+        print(
+            f"{app:20s} imports {result['imports_seconds'] * 1000:8.1f} ms   "
+            f"first run {result['first_run_seconds'] * 1000:8.1f} ms   "
+            f"warm-up {result.get('warm_up_seconds', 0) * 1000:8.1f} ms   "
+            f"rerun {result['rerun_seconds'] * 1000:8.1f} ms"
+        )
+        for error in result["errors"]:
+            print(f"  error: {error}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+import zlib
+
+import numpy as np
+
+from metrics import stage
+from retrieval import estimate_tokens, tokenize
+
+# Chunks whose estimated word-shingle Jaccard similarity reaches this are collapsed into one
+DEFAULT_THRESHOLD = 0.85
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+# 16 bands of 8 rows: pairs above ~0.7 similarity almost always share a bucket
+BANDS = 16
+
+_MASK32 = np.uint64(0xFFFFFFFF)
+
+
+class MinHasher:
+    def __init__(self, num_perm=NUM_PERM, shingle_words=SHINGLE_WORDS, seed=1):
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: (a * x + b) mod 2**64, top 32 bits; a must be odd
+        self.a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+        self.shingle_words = shingle_words
+
+    def shingles(self, text):
+        tokens = tokenize(text)
+        n = min(self.shingle_words, len(tokens))
+        if n == 0:
+            return np.array([zlib.crc32(text.encode("utf-8"))], dtype=np.uint64)
+        return np.fromiter(
+            {zlib.crc32(" ".join(tokens[i:i + n]).encode("utf-8")) for i in range(len(tokens) - n + 1)},
+            dtype=np.uint64,
+        )
+
+    def signature(self, text):
+        shingles = self.shingles(text)[:, None]
+        with np.errstate(over="ignore"):
+            hashes = (shingles * self.a + self.b) >> np.uint64(32)
+        return (hashes & _MASK32).min(axis=0).astype(np.uint32)
+
+
+def dedup_chunks(chunks, metadatas=None, threshold=DEFAULT_THRESHOLD, bands=BANDS, hasher=None):
+    """
+    Collapse near-duplicate chunks (e.g. the same report as draft, PDF and DOCX) into the
+    first occurrence. The kept chunk's metadata gets "sources": the metadata of every
+    chunk it stands for, itself first. Returns (chunks, metadatas, stats).
+    """
+    metadatas = list(metadatas) if metadatas is not None else [{} for _ in chunks]
+    hasher = hasher or MinHasher()
+    rows = len(hasher.a) // bands
+    kept, kept_meta, signatures, buckets = [], [], [], [{} for _ in range(bands)]
+    with stage("dedup") as info:
+        for chunk, metadata in zip(chunks, metadatas):
+            signature = hasher.signature(chunk)
+            keys = [signature[band * rows:(band + 1) * rows].tobytes() for band in range(bands)]
+            match = None
+            candidates = {j for band, key in enumerate(keys) for j in buckets[band].get(key, ())}
+            for j in sorted(candidates):
+                if np.mean(signatures[j] == signature) >= threshold:
+                    match = j
+                    break
+            if match is not None:
+                kept_meta[match]["sources"].append(metadata)
+                continue
+            for band, key in enumerate(keys):
+                buckets[band].setdefault(key, []).append(len(kept))
+            signatures.append(signature)
+            kept.append(chunk)
+            kept_meta.append(dict(metadata, sources=[metadata]))
+        info["bytes"] = sum(len(c) for c in chunks)
+
+    tokens_before = sum(estimate_tokens(c) for c in chunks)
+    tokens_after = sum(estimate_tokens(c) for c in kept)
+    stats = {
+        "chunks": len(chunks),
+        "kept": len(kept),
+        "removed": len(chunks) - len(kept),
+        "ratio": (len(chunks) - len(kept)) / len(chunks) if chunks else 0.0,
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+    }
+    return kept, kept_meta, stats
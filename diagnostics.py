@@ -0,0 +1,78 @@
+import cProfile
+
+import streamlit as st
+
+from jobs import shared_job_runner
+from metrics import METRICS, profile_report
+
+
+def start_rerun_profile():
+    # A run that ended in an uncaught exception leaves its profiler running; close that report first
+    finish_rerun_profile()
+    # A profile requested with the button below covers exactly one rerun
+    if st.session_state.pop("profile_next_rerun", False):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        st.session_state["_rerun_profiler"] = profiler
+
+
+def finish_rerun_profile():
+    profiler = st.session_state.pop("_rerun_profiler", None)
+    if profiler is None:
+        return
+    profiler.disable()
+    st.session_state["last_rerun_profile"] = profile_report(profiler)
+
+
+def rerun(**kwargs):
+    """st.rerun() for the page body: it raises, so the profile is finished first."""
+    finish_rerun_profile()
+    st.rerun(**kwargs)
+
+
+def render_diagnostics_panel():
+    with st.sidebar.expander("🩺 Diagnostics", expanded=False):
+        if not METRICS.enabled:
+            st.caption("Metrics are off (TAKTAK_METRICS=0).")
+        snapshot = METRICS.snapshot()
+        if snapshot:
+            st.table([
+                {
+                    "stage": name,
+                    "calls": values["count"],
+                    "errors": values["errors"],
+                    "avg ms": round(values["avg_seconds"] * 1000, 1),
+                    "max ms": round(values["max_seconds"] * 1000, 1),
+                    "MB": round(values["bytes"] / 1e6, 2),
+                    "pages": values["pages"],
+                }
+                for name, values in snapshot.items()
+            ])
+            st.download_button("Export Prometheus", METRICS.to_prometheus(), file_name="metrics.prom", mime="text/plain")
+            st.download_button("Export JSON lines", METRICS.to_json_lines(), file_name="metrics.jsonl", mime="application/json")
+            if st.button("Reset metrics"):
+                METRICS.reset()
+        else:
+            st.caption("No stages recorded yet.")
+
+        jobs = shared_job_runner().jobs()
+        if jobs:
+            st.caption("Background jobs")
+            st.table([
+                {
+                    "job": job.id,
+                    "kind": job.kind,
+                    "state": job.state,
+                    "progress": f"{job.progress:.0%}",
+                    "seconds": round(job.elapsed(), 1),
+                    "sessions": len(job.subscribers),
+                }
+                for job in jobs[:20]
+            ])
+
+        if st.button("Profile next rerun"):
+            st.session_state["profile_next_rerun"] = True
+        report = st.session_state.get("last_rerun_profile")
+        if report:
+            st.download_button("Download profile", report, file_name="rerun_profile.txt", mime="text/plain")
+            st.code(report[:4000])
@@ -0,0 +1,152 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "TAKTAK_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "taktak"),
+)
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_key(*parts):
+    return hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """Content-addressed blob store with an SQLite index and LRU eviction by total size."""
+
+    def __init__(self, name, max_bytes=512 * 1024 * 1024, root=DEFAULT_CACHE_DIR):
+        self.root = os.path.join(root, name)
+        self.blob_dir = os.path.join(self.root, "blobs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            os.path.join(self.root, "index.sqlite"),
+            timeout=30,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    def _blob_path(self, key):
+        return os.path.join(self.blob_dir, key[:2], key)
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            try:
+                with open(self._blob_path(key), "rb") as f:
+                    data = f.read()
+            except OSError:
+                # Blob vanished underneath us; drop the stale index row
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        path = self._blob_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, size, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, len(data), now, now),
+            )
+            self._evict()
+
+    def get_text(self, key):
+        data = self.get(key)
+        return None if data is None else data.decode("utf-8")
+
+    def put_text(self, key, text):
+        self.put(key, text.encode("utf-8"))
+
+    def delete(self, key):
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        try:
+            os.remove(self._blob_path(key))
+        except OSError:
+            pass
+
+    def clear(self):
+        with self._lock:
+            keys = [row[0] for row in self._db.execute("SELECT key FROM entries")]
+            self._db.execute("DELETE FROM entries")
+        for key in keys:
+            try:
+                os.remove(self._blob_path(key))
+            except OSError:
+                pass
+
+    def total_bytes(self):
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute(
+            "SELECT key, size FROM entries ORDER BY accessed ASC"
+        ).fetchall():
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            try:
+                os.remove(self._blob_path(key))
+            except OSError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
@@ -0,0 +1,74 @@
+import os
+
+from metrics import stage
+from tabular import TABULAR_EXTENSIONS, table_chunks
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt", ".csv", ".xlsx")
+
+
+def warm_up():
+    # Loader libraries are imported on first use; this pays for them ahead of time
+    import docx  # noqa: F401
+    import openpyxl  # noqa: F401
+    import pandas  # noqa: F401
+    import PyPDF2  # noqa: F401
+
+
+def extract_text_from_file(filepath):
+    return extract_chunks_from_file(filepath)[0]
+
+
+def extract_chunks_from_file(filepath):
+    """Return (text, chunks). Spreadsheets are streamed into row-group chunks instead of one big table dump."""
+    ext = os.path.splitext(filepath)[1].lower()
+    with stage(f"extract{ext}") as info:
+        if ext in TABULAR_EXTENSIONS:
+            chunks = table_chunks(filepath)
+            text = "\n\n".join(chunks)
+        else:
+            text = _extract_text(filepath, ext)
+            chunks = chunk_text(text)
+        info["bytes"] = len(text)
+    return text, chunks
+
+
+def _extract_text(filepath, ext):
+    if ext == ".pdf":
+        from PyPDF2 import PdfReader
+
+        with open(filepath, "rb") as f:
+            reader = PdfReader(f)
+            return "\n".join([p.extract_text() or "" for p in reader.pages])
+    elif ext == ".docx":
+        from docx import Document as DocxDocument
+
+        doc = DocxDocument(filepath)
+        return "\n".join([p.text for p in doc.paragraphs])
+    elif ext == ".txt":
+        with open(filepath, "r", encoding="utf-8") as f:
+            return f.read()
+    return ""
+
+
+def chunk_text(text, chunk_chars=1500, overlap=200):
+    """Split text into overlapping chunks, preferring paragraph and line breaks as cut points."""
+    text = text.strip()
+    if not text:
+        return []
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_chars, len(text))
+        if end < len(text):
+            for sep in ("\n\n", "\n", ". ", " "):
+                cut = text.rfind(sep, start + chunk_chars // 2, end)
+                if cut != -1:
+                    end = cut + len(sep)
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
@@ -0,0 +1,83 @@
+import bisect
+
+SOURCE_TEXT = "text"
+SOURCE_OCR = "ocr"
+
+
+class PageSegment:
+    """One page of extracted text, addressed by character offsets into ExtractedText.text."""
+
+    __slots__ = ("page", "source", "lang", "start", "body_start", "end")
+
+    def __init__(self, page, source, lang, start, body_start, end):
+        self.page = page
+        self.source = source
+        self.lang = lang
+        self.start = start
+        self.body_start = body_start
+        self.end = end
+
+    def __repr__(self):
+        return f"PageSegment(page={self.page}, source={self.source!r}, lang={self.lang!r}, span=({self.start}, {self.end}))"
+
+
+class ExtractedText:
+    """
+    Extracted pages concatenated once, with a PageSegment per page.
+
+    The text keeps the "--- Page N ---" headers the UI and exports show; everything
+    else works on segment slices instead of re-scanning the string.
+    """
+
+    __slots__ = ("text", "segments", "_starts")
+
+    def __init__(self, text, segments):
+        self.text = text
+        self.segments = segments
+        self._starts = [s.start for s in segments]
+
+    @classmethod
+    def from_pages(cls, pages):
+        """pages: iterable of (page, source, lang, body), in any order."""
+        parts = []
+        segments = []
+        offset = 0
+        for page, source, lang, body in sorted(pages, key=lambda p: p[0]):
+            body = body.strip()
+            if not body:
+                continue
+            if segments:
+                parts.append("\n\n")
+                offset += 2
+            header = f"--- Page {page} (OCR) ---\n" if source == SOURCE_OCR else f"--- Page {page} ---\n"
+            parts.append(header)
+            parts.append(body)
+            segments.append(PageSegment(page, source, lang, offset, offset + len(header), offset + len(header) + len(body)))
+            offset += len(header) + len(body)
+        return cls("".join(parts), segments)
+
+    def __len__(self):
+        return len(self.segments)
+
+    def section(self, segment):
+        return self.text[segment.start:segment.end]
+
+    def body(self, segment):
+        return self.text[segment.body_start:segment.end]
+
+    def select(self, sources=None, pages=None):
+        return [
+            s for s in self.segments
+            if (sources is None or s.source in sources) and (pages is None or s.page in pages)
+        ]
+
+    def join(self, segments=None):
+        if segments is None or len(segments) == len(self.segments):
+            return self.text
+        return "\n\n".join(self.section(s) for s in segments)
+
+    def segment_at(self, offset):
+        i = bisect.bisect_right(self._starts, offset) - 1
+        if i < 0 or offset >= self.segments[i].end:
+            return None
+        return self.segments[i]
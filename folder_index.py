@@ -0,0 +1,232 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+from disk_cache import DEFAULT_CACHE_DIR, hash_file
+from doc_loaders import SUPPORTED_EXTENSIONS
+from ingest import DEFAULT_MEMORY_MB, DEFAULT_TIMEOUT, extract_files
+
+# Bump when extraction or chunking changes so existing rows are rebuilt
+FORMAT_VERSION = 2
+
+
+class FolderIndex:
+    """
+    Persistent per-file index of extracted text and chunks.
+
+    Files are keyed by absolute path and re-extracted only when their mtime or size
+    changes and their SHA-256 no longer matches. Extraction runs in worker processes
+    (see ingest.extract_files) with a per-file timeout and memory limit; batches are
+    driven from background threads.
+    """
+
+    def __init__(self, db_path=None, max_workers=2, workers=None, timeout=DEFAULT_TIMEOUT, memory_mb=DEFAULT_MEMORY_MB):
+        db_path = db_path or os.path.join(DEFAULT_CACHE_DIR, "folder_index.sqlite")
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY,"
+            " mtime REAL NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " sha256 TEXT NOT NULL,"
+            " text TEXT NOT NULL,"
+            " chunks TEXT NOT NULL,"
+            " error TEXT,"
+            " indexed_at REAL NOT NULL)"
+        )
+        if self._db.execute("PRAGMA user_version").fetchone()[0] < FORMAT_VERSION:
+            self._db.execute("DELETE FROM files")
+            self._db.execute(f"PRAGMA user_version = {FORMAT_VERSION}")
+        self.workers = workers
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="folder-index")
+        self._pending = {}
+
+    @staticmethod
+    def list_files(folder_path):
+        try:
+            entries = list(os.scandir(folder_path))
+        except OSError:
+            return []
+        return sorted(
+            e.name for e in entries
+            if e.name.lower().endswith(SUPPORTED_EXTENSIONS) and e.is_file()
+        )
+
+    def _row(self, path):
+        with self._lock:
+            return self._db.execute(
+                "SELECT mtime, size, sha256, text, chunks, error FROM files WHERE path = ?", (path,)
+            ).fetchone()
+
+    def is_fresh(self, path):
+        row = self._row(os.path.abspath(path))
+        if row is None:
+            return False
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return row[0] == st.st_mtime and row[1] == st.st_size
+
+    def _store(self, path, st, result):
+        sha256 = result.sha256
+        if sha256 is None:
+            # Timed out before hashing; remember the failure until the file changes
+            try:
+                sha256 = hash_file(path)
+            except OSError:
+                return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (path, mtime, size, sha256, text, chunks, error, indexed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, st.st_mtime, st.st_size, sha256, result.text, json.dumps(result.chunks), result.error, time.time()),
+            )
+
+    def _extract_batch(self, claimed):
+        tasks, stats = [], {}
+        for path in claimed:
+            try:
+                stats[path] = os.stat(path)
+            except OSError as e:
+                self._finish(path, {"sha256": None, "text": "", "chunks": [], "error": str(e)}, "failed", 0.0)
+                continue
+            row = self._row(path)
+            tasks.append((path, row[2] if row is not None else None))
+        done = set()
+        try:
+            for result in extract_files(tasks, workers=self.workers, timeout=self.timeout, memory_mb=self.memory_mb):
+                done.add(result.path)
+                st = stats[result.path]
+                if result.unchanged:
+                    # Touched but unchanged: only refresh the stat fields
+                    with self._lock:
+                        self._db.execute(
+                            "UPDATE files SET mtime = ?, size = ? WHERE path = ?",
+                            (st.st_mtime, st.st_size, result.path),
+                        )
+                    status = "cached"
+                elif result.transient:
+                    # The worker failed, not the file: report it but try again on the next refresh
+                    self._finish(
+                        result.path, {"sha256": None, "text": "", "chunks": [], "error": result.error},
+                        "failed", result.seconds,
+                    )
+                    continue
+                else:
+                    self._store(result.path, st, result)
+                    status = "timeout" if result.timed_out else "failed" if result.error else "indexed"
+                entry = self._entry(result.path) or {
+                    "sha256": result.sha256, "text": "", "chunks": [], "error": result.error,
+                }
+                self._finish(result.path, entry, status, result.seconds)
+        finally:
+            for path, _ in tasks:
+                if path not in done:
+                    self._finish(path, {"sha256": None, "text": "", "chunks": [], "error": "extraction aborted"}, "failed", 0.0)
+
+    def _finish(self, path, entry, status, seconds):
+        with self._lock:
+            future = self._pending.pop(path, None)
+        if future is not None:
+            future.set_result(dict(entry, path=path, status=status, seconds=seconds))
+
+    def _claim(self, paths):
+        """Split paths into ({path: future} being extracted, [paths] this caller must extract)."""
+        futures, claimed = {}, []
+        with self._lock:
+            for path in paths:
+                future = self._pending.get(path)
+                if future is None:
+                    future = self._pending[path] = Future()
+                    claimed.append(path)
+                futures[path] = future
+        return futures, claimed
+
+    def refresh(self, paths):
+        """Queue every new or changed file for background extraction; returns the queued paths."""
+        stale = [p for p in dict.fromkeys(os.path.abspath(p) for p in paths) if not self.is_fresh(p)]
+        _, claimed = self._claim(stale)
+        if claimed:
+            self._pool.submit(self._extract_batch, claimed)
+        return claimed
+
+    def refresh_folder(self, folder_path):
+        return self.refresh(os.path.join(folder_path, f) for f in self.list_files(folder_path))
+
+    def ingest(self, paths):
+        """
+        Yield the entry for every path (see get(), plus "path", "status" and "seconds") as soon
+        as it is ready: indexed files right away, the rest in the order their extraction finishes.
+        status is "cached", "indexed", "failed" or "timeout".
+        """
+        futures = {}
+        for path in dict.fromkeys(os.path.abspath(p) for p in paths):
+            if self.is_fresh(path):
+                entry = self._entry(path)
+                yield dict(entry, path=path, status="failed" if entry["error"] else "cached", seconds=0.0)
+            else:
+                futures[path] = None
+        if futures:
+            futures, claimed = self._claim(futures)
+            if claimed:
+                self._pool.submit(self._extract_batch, claimed)
+            for future in as_completed(futures.values()):
+                yield future.result()
+
+    def get(self, path, wait=True):
+        """Return {"text", "chunks", "sha256", "error"} for path, extracting it first if needed."""
+        path = os.path.abspath(path)
+        if not self.is_fresh(path):
+            if not wait:
+                return None
+            for _ in self.ingest([path]):
+                pass
+        return self._entry(path)
+
+    def _entry(self, path):
+        row = self._row(path)
+        if row is None:
+            return None
+        return {"sha256": row[2], "text": row[3], "chunks": json.loads(row[4]), "error": row[5]}
+
+    def hashes(self, paths):
+        """Return {path: sha256} for the given paths that are indexed and unchanged on disk."""
+        paths = [os.path.abspath(p) for p in paths]
+        rows = {}
+        with self._lock:
+            for i in range(0, len(paths), 500):
+                batch = paths[i:i + 500]
+                rows.update(
+                    (path, (mtime, size, sha256))
+                    for path, mtime, size, sha256 in self._db.execute(
+                        f"SELECT path, mtime, size, sha256 FROM files WHERE path IN ({','.join('?' * len(batch))})",
+                        batch,
+                    )
+                )
+        fresh = {}
+        for path, (mtime, size, sha256) in rows.items():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if st.st_mtime == mtime and st.st_size == size:
+                fresh[path] = sha256
+        return fresh
+
+    def text(self, path):
+        row = self._row(os.path.abspath(path))
+        return row[3] if row is not None else None
+
+    def status(self):
+        with self._lock:
+            indexed = self._db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            return {"indexed": indexed, "pending": len(self._pending)}
@@ -0,0 +1,201 @@
+import collections
+import os
+import time
+from multiprocessing.connection import wait
+
+from disk_cache import hash_file
+from ocr_engine import available_cores, process_context
+
+# Per-file limits for folder extraction; a file that exceeds them is reported instead of stalling the rest
+DEFAULT_TIMEOUT = float(os.environ.get("TAKTAK_INGEST_TIMEOUT", "120"))
+DEFAULT_MEMORY_MB = int(os.environ.get("TAKTAK_INGEST_MEMORY_MB", "2048"))
+
+
+class ExtractResult:
+    """
+    One extracted file. transient marks errors of the extraction machinery rather than of
+    the file (a worker that could not start or died), which are not worth remembering.
+    """
+
+    __slots__ = ("path", "sha256", "text", "chunks", "error", "seconds", "unchanged", "timed_out", "transient")
+
+    def __init__(self, path, sha256=None, text="", chunks=None, error=None, seconds=0.0, unchanged=False,
+                 timed_out=False, transient=False):
+        self.path = path
+        self.sha256 = sha256
+        self.text = text
+        self.chunks = chunks or []
+        self.error = error
+        self.seconds = seconds
+        self.unchanged = unchanged
+        self.timed_out = timed_out
+        self.transient = transient
+
+
+def _limit_memory(memory_mb):
+    try:
+        import resource
+    except ImportError:
+        # No RLIMIT_AS on Windows; the timeout still applies
+        return
+    if not memory_mb:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = memory_mb * 1024 * 1024
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _worker_main(conn, memory_mb):
+    # Parallelism comes from the worker processes, so keep numeric libraries single-threaded
+    for name in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(name, "1")
+    _limit_memory(memory_mb)
+    from doc_loaders import extract_chunks_from_file
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        path, known_sha256 = task
+        sha256 = None
+        out_of_memory = False
+        # The last field tells the parent whether this worker exits after the reply
+        try:
+            sha256 = hash_file(path)
+            if sha256 == known_sha256:
+                conn.send((sha256, None, None, None, False))
+                continue
+            text, chunks = extract_chunks_from_file(path)
+            conn.send((sha256, text, chunks, None, False))
+        except MemoryError:
+            out_of_memory = True
+        except Exception as e:
+            conn.send((sha256, "", [], f"{type(e).__name__}: {e}", False))
+        if out_of_memory:
+            # Replied outside the handler so the traceback's frames are freed first; the heap
+            # may still be fragmented past the limit, so the parent retires this worker
+            conn.send((sha256, "", [], f"out of memory (limit {memory_mb} MB)", True))
+            return
+
+
+class _Worker:
+    def __init__(self, ctx, memory_mb):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child, memory_mb), daemon=True, name="ingest")
+        self.process.start()
+        child.close()
+        self.task = None
+        self.started = None
+        self.completed = 0
+
+    @property
+    def path(self):
+        return self.task[0]
+
+    def submit(self, path, known_sha256):
+        self.task = (path, known_sha256)
+        self.started = time.monotonic()
+        self.conn.send(self.task)
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def stop(self, kill=False):
+        if not kill and self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+            self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+def extract_files(tasks, workers=None, timeout=DEFAULT_TIMEOUT, memory_mb=DEFAULT_MEMORY_MB):
+    """
+    Extract (path, known_sha256) tasks in worker processes and yield an ExtractResult for
+    each as soon as it finishes. A file whose hash equals known_sha256 is not extracted
+    again (result.unchanged). A file that runs past timeout seconds has its worker killed;
+    one that hits the memory_mb address-space limit or crashes its worker is reported as
+    an error. Either way a fresh worker takes over the remaining files. A reused worker
+    that dies between files is not the next file's fault, so that file is retried once.
+    """
+    queue = collections.deque(tasks)
+    if not queue:
+        return
+    ctx = process_context()
+    workers = max(1, min(workers or available_cores(), len(queue)))
+    idle = []
+    busy = {}
+    retried = set()
+
+    def requeue(worker):
+        # Only files handed to a worker that already finished others are retried
+        if worker.completed and worker.path not in retried:
+            retried.add(worker.path)
+            queue.appendleft(worker.task)
+            return True
+        return False
+
+    try:
+        while queue or busy:
+            while queue and (idle or len(busy) < workers):
+                worker = idle.pop() if idle else _Worker(ctx, memory_mb)
+                if not worker.process.is_alive():
+                    worker.stop(kill=True)
+                    worker = _Worker(ctx, memory_mb)
+                path, known_sha256 = queue.popleft()
+                try:
+                    worker.submit(path, known_sha256)
+                except OSError:
+                    worker.stop(kill=True)
+                    if not requeue(worker):
+                        yield ExtractResult(path, error="extraction process could not be started", transient=True)
+                    continue
+                busy[worker.conn] = worker
+            if not busy:
+                continue
+            wait_seconds = None
+            if timeout:
+                wait_seconds = max(0.0, min(timeout - w.elapsed() for w in busy.values()))
+            ready = wait(list(busy), timeout=wait_seconds)
+            for conn in ready:
+                worker = busy.pop(conn)
+                seconds = worker.elapsed()
+                try:
+                    sha256, text, chunks, error, exiting = conn.recv()
+                except (EOFError, OSError):
+                    worker.process.join(1)
+                    worker.stop(kill=True)
+                    if not requeue(worker):
+                        yield ExtractResult(
+                            worker.path, error=f"extraction process exited with code {worker.process.exitcode}",
+                            seconds=seconds, transient=True,
+                        )
+                    continue
+                worker.completed += 1
+                if exiting:
+                    worker.stop(kill=True)
+                else:
+                    idle.append(worker)
+                yield ExtractResult(
+                    worker.path, sha256, text or "", chunks, error, seconds, unchanged=text is None and error is None
+                )
+            if timeout:
+                for conn, worker in list(busy.items()):
+                    if worker.elapsed() >= timeout:
+                        del busy[conn]
+                        worker.stop(kill=True)
+                        yield ExtractResult(
+                            worker.path, error=f"timed out after {timeout:g}s", seconds=worker.elapsed(), timed_out=True
+                        )
+    finally:
+        for worker in idle + list(busy.values()):
+            worker.stop(kill=worker in busy.values())
@@ -0,0 +1,81 @@
+import uuid
+
+import streamlit as st
+
+from jobs import shared_job_runner
+
+POLL_SECONDS = 0.5
+
+
+def _subscriber():
+    if "job_subscriber" not in st.session_state:
+        st.session_state.job_subscriber = uuid.uuid4().hex
+    return st.session_state.job_subscriber
+
+
+def start_job(slot, kind, key, fn, *args, **kwargs):
+    """Submit (or join an identical) background job and remember it in this session under slot."""
+    job = shared_job_runner().submit(kind, key, fn, *args, subscriber=_subscriber(), **kwargs)
+    st.session_state[slot] = job.id
+    return job
+
+
+def tracked_job(slot, kind=None, key=None):
+    """The job this session started under slot, if it still exists and matches kind/key."""
+    job_id = st.session_state.get(slot)
+    job = shared_job_runner().get(job_id) if job_id else None
+    if job is None:
+        st.session_state.pop(slot, None)
+        return None
+    if kind is not None and job.key != (kind, key):
+        return None
+    return job
+
+
+def forget_job(slot):
+    st.session_state.pop(slot, None)
+
+
+def cancel_job(slot):
+    """Stop waiting for the job in slot; the work itself stops once no other session waits for it."""
+    job_id = st.session_state.pop(slot, None)
+    job = shared_job_runner().release(job_id, subscriber=_subscriber()) if job_id else None
+    if job is not None:
+        st.session_state[f"{slot}_cancelled"] = job.key
+
+
+def was_cancelled(slot, kind, key):
+    """True when this session cancelled the kind/key job in slot and has not asked for it again."""
+    return st.session_state.get(f"{slot}_cancelled") == (kind, key)
+
+
+def clear_cancelled(slot):
+    st.session_state.pop(f"{slot}_cancelled", None)
+
+
+def job_progress(slot, job, label, render_partial=None):
+    """
+    Return True once job has finished. Until then, draw a progress bar and cancel button
+    in a fragment that polls on its own, so the rest of the page is not rerun or blocked.
+
+    render_partial(job.partial) is called on every poll when given; otherwise the whole
+    app reruns once when the first partial result shows up.
+    """
+    if job.done:
+        return True
+    had_partial = job.partial is not None
+
+    @st.fragment(run_every=POLL_SECONDS)
+    def poll():
+        if job.done or (render_partial is None and (job.partial is not None) != had_partial):
+            st.rerun(scope="app")
+        text = f"{label} {job.message}".strip()
+        st.progress(job.progress, text=f"{text} · {job.elapsed():.0f}s")
+        if render_partial is not None and job.partial is not None:
+            render_partial(job.partial)
+        if st.button("Cancel", key=f"cancel-{job.id}"):
+            cancel_job(slot)
+            st.rerun(scope="app")
+
+    poll()
+    return False
@@ -0,0 +1,161 @@
+import functools
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """
+    One unit of background work. The worker function receives the job and reports
+    through update(); it should call check_cancelled() between steps.
+    """
+
+    def __init__(self, kind, key):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.key = key
+        self.state = QUEUED
+        self.progress = 0.0
+        self.message = ""
+        self.partial = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.subscribers = set()
+        self._cancel = threading.Event()
+
+    @property
+    def done(self):
+        return self.state in FINISHED_STATES
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def update(self, progress=None, message=None, partial=None):
+        if progress is not None:
+            self.progress = min(max(progress, 0.0), 1.0)
+        if message is not None:
+            self.message = message
+        if partial is not None:
+            self.partial = partial
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+
+    def cancel(self):
+        self._cancel.set()
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+
+class JobRunner:
+    """
+    Shared pool for OCR, TTS and LLM work that must outlive a Streamlit rerun.
+
+    Jobs submitted with the same key while an earlier one is queued, running or done
+    get the existing job back, so identical requests from several sessions run once.
+    Each caller subscribes to the job; release() drops a subscriber and only cancels
+    the work once nobody is waiting for it. Finished jobs are kept for keep_seconds
+    so reruns can still collect the result.
+    """
+
+    def __init__(self, max_workers=None, keep_seconds=1800, max_jobs=200):
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers or int(os.environ.get("TAKTAK_JOB_WORKERS", "4")),
+            thread_name_prefix="job",
+        )
+        self.keep_seconds = keep_seconds
+        self.max_jobs = max_jobs
+        self._jobs = {}
+        self._by_key = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, key, fn, *args, subscriber=None, **kwargs):
+        """Run fn(job, *args, **kwargs) in the background; returns the (possibly shared) Job."""
+        key = (kind, key)
+        with self._lock:
+            self._prune()
+            existing = self._by_key.get(key)
+            if existing is not None and existing.state not in (FAILED, CANCELLED) and not existing.cancel_requested:
+                existing.subscribers.add(subscriber)
+                return existing
+            job = Job(kind, key)
+            job.subscribers.add(subscriber)
+            self._jobs[job.id] = job
+            self._by_key[key] = job
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.started = time.time()
+        state = DONE
+        try:
+            job.check_cancelled()
+            job.state = RUNNING
+            job.result = fn(job, *args, **kwargs)
+            job.progress = 1.0
+        except JobCancelled:
+            state = CANCELLED
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            state = FAILED
+        # finished is set first so anything that sees a final state can rely on it
+        job.finished = time.time()
+        job.state = state
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def release(self, job_id, subscriber=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job.subscribers.discard(subscriber)
+            if not job.subscribers and not job.done:
+                job.cancel()
+        return job
+
+    def jobs(self):
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.created, reverse=True)
+
+    def _prune(self):
+        now = time.time()
+        finished = sorted(
+            (j for j in self._jobs.values() if j.done),
+            key=lambda j: j.finished,
+        )
+        overflow = len(self._jobs) - self.max_jobs
+        for job in finished:
+            if now - job.finished > self.keep_seconds or overflow > 0:
+                del self._jobs[job.id]
+                if self._by_key.get(job.key) is job:
+                    del self._by_key[job.key]
+                overflow -= 1
+
+
+@functools.lru_cache(maxsize=None)
+def shared_job_runner():
+    return JobRunner()
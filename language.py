@@ -0,0 +1,92 @@
+import threading
+from collections import Counter
+
+from disk_cache import hash_bytes, make_key
+from metrics import stage
+
+SAMPLE_CHARS = 2000
+SAMPLE_WINDOWS = 4
+MIN_CHARS = 10
+
+_detector = None
+_detector_lock = threading.Lock()
+
+
+def _langdetect():
+    """Import langdetect and load its ~55 language profiles once per process."""
+    global _detector
+    if _detector is None:
+        with _detector_lock:
+            if _detector is None:
+                from langdetect import DetectorFactory, LangDetectException, detect, detector_factory
+
+                # langdetect is randomized; a fixed seed makes cached and fresh results agree
+                DetectorFactory.seed = 0
+                detector_factory.init_factory()
+                _detector = (detect, LangDetectException)
+    return _detector
+
+
+def warm_up():
+    _langdetect()
+
+
+def sample_text(text, max_chars=SAMPLE_CHARS, windows=SAMPLE_WINDOWS):
+    """Take up to max_chars from evenly spaced windows so detection cost is capped."""
+    text = text.strip()
+    if len(text) <= max_chars:
+        return text
+    width = max_chars // windows
+    step = (len(text) - width) / max(1, windows - 1)
+    parts = []
+    for i in range(windows):
+        start = int(i * step)
+        # Start on a word boundary so windows don't open with a broken word
+        space = text.find(" ", start, start + 50)
+        if space != -1:
+            start = space + 1
+        parts.append(text[start:start + width])
+    return " ".join(parts)
+
+
+def detect_language(text, default="en", max_chars=SAMPLE_CHARS, cache=None):
+    sample = sample_text(text, max_chars=max_chars)
+    if len(sample) < MIN_CHARS:
+        return default
+    key = make_key("lang", hash_bytes(sample.encode("utf-8"))) if cache is not None else None
+    if key is not None:
+        cached = cache.get_text(key)
+        if cached is not None:
+            return cached
+    detect, LangDetectException = _langdetect()
+    with stage("langdetect", bytes=len(sample)):
+        try:
+            lang = detect(sample)
+        except LangDetectException:
+            # Not cached: the fallback depends on the caller's default, not on the text
+            return default
+    if key is not None:
+        cache.put_text(key, lang)
+    return lang
+
+
+def detect_page_languages(pages, default="en", cache=None):
+    """
+    pages: {page: text}; returns {page: language code}. langdetect is pure Python and
+    samples are capped at SAMPLE_CHARS, so pages are detected one after another.
+    """
+    return {n: detect_language(text, default=default, cache=cache) for n, text in pages.items()}
+
+
+def dominant_language(page_langs, weights=None, default="en"):
+    counts = Counter()
+    for page, lang in page_langs.items():
+        counts[lang] += weights.get(page, 1) if weights else 1
+    return counts.most_common(1)[0][0] if counts else default
+
+
+def nearest_language(page, page_langs, default="en"):
+    """Language of the closest page with a known language; used to guess scanned pages before OCR."""
+    if not page_langs:
+        return default
+    return page_langs[min(page_langs, key=lambda p: (abs(p - page), p))]
@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+import time
+
+import requests
+
+from metrics import METRICS
+
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+
+# Same wording as LangChain's default "stuff" QA prompt
+QA_PROMPT = (
+    "Use the following pieces of context to answer the question at the end. "
+    "If you don't know the answer, just say that you don't know, don't try to make up an answer.\n\n"
+    "{context}\n\n"
+    "Question: {question}\n"
+    "Helpful Answer:"
+)
+
+
+def build_qa_prompt(docs, question):
+    context = "\n\n".join(doc.page_content for doc in docs)
+    return QA_PROMPT.format(context=context, question=question)
+
+
+class OllamaClient:
+    """
+    Long-lived Ollama client: one pooled HTTP session, streamed generation, per-request timings.
+    """
+
+    def __init__(self, model="llama3", base_url=OLLAMA_HOST, keep_alive="30m", timeout=300):
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def warm_up(self):
+        # An empty prompt makes Ollama load the model into memory without generating
+        try:
+            self.session.post(
+                f"{self.base_url}/api/generate",
+                json={"model": self.model, "prompt": "", "keep_alive": self.keep_alive},
+                timeout=self.timeout,
+            ).raise_for_status()
+            return True
+        except requests.RequestException:
+            return False
+
+    def warm_up_async(self):
+        threading.Thread(target=self.warm_up, name="ollama-warm-up", daemon=True).start()
+
+    def stream(self, prompt, metrics=None, **options):
+        """
+        Yield response text pieces as they arrive. The client is shared by concurrent
+        requests, so each call's timings go into its own metrics dict, filled in once the
+        response is complete.
+        """
+        start = time.perf_counter()
+        first_token = None
+        pieces = 0
+        final = {}
+        payload = {"model": self.model, "prompt": prompt, "stream": True, "keep_alive": self.keep_alive}
+        if options:
+            payload["options"] = options
+        with self.session.post(
+            f"{self.base_url}/api/generate", json=payload, stream=True, timeout=self.timeout
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                message = json.loads(line)
+                if message.get("error"):
+                    raise RuntimeError(message["error"])
+                piece = message.get("response", "")
+                if piece:
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+                    pieces += 1
+                    yield piece
+                if message.get("done"):
+                    final = message
+                    break
+
+        elapsed = time.perf_counter() - start
+        tokens = final.get("eval_count") or pieces
+        eval_seconds = final.get("eval_duration", 0) / 1e9 or (elapsed - (first_token or 0.0))
+        record = metrics if metrics is not None else {}
+        record.update({
+            "model": self.model,
+            "prompt_chars": len(prompt),
+            "prompt_tokens": final.get("prompt_eval_count"),
+            "tokens": tokens,
+            "time_to_first_token": first_token,
+            "total_seconds": elapsed,
+            "tokens_per_second": tokens / eval_seconds if eval_seconds > 0 else 0.0,
+        })
+        METRICS.record("llm.generate", elapsed, bytes=len(prompt))
+
+    def generate(self, prompt, metrics=None, **options):
+        return "".join(self.stream(prompt, metrics=metrics, **options))
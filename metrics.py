@@ -0,0 +1,137 @@
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import deque
+
+# Set TAKTAK_METRICS=0 to turn recording off; stage() then returns one shared no-op context
+ENABLED = os.environ.get("TAKTAK_METRICS", "1") != "0"
+
+# What a disabled stage() yields; callers may write "bytes"/"pages" into it, nothing reads them
+_DISABLED_STAGE = contextlib.nullcontext({})
+
+
+class _Stage:
+    __slots__ = ("count", "errors", "seconds", "max_seconds", "bytes", "pages")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.bytes = 0
+        self.pages = 0
+
+
+class Metrics:
+    """Process-wide per-stage timings, byte/page counts and errors, plus a ring of recent events."""
+
+    def __init__(self, recent=500):
+        self.enabled = ENABLED
+        self._stages = {}
+        self._recent = deque(maxlen=recent)
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, error=None, bytes=0, pages=0):
+        if not self.enabled:
+            return
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                stage = self._stages[name] = _Stage()
+            stage.count += 1
+            stage.seconds += seconds
+            stage.max_seconds = max(stage.max_seconds, seconds)
+            stage.bytes += bytes
+            stage.pages += pages
+            if error is not None:
+                stage.errors += 1
+            self._recent.append({
+                "ts": time.time(),
+                "stage": name,
+                "seconds": seconds,
+                "bytes": bytes,
+                "pages": pages,
+                "error": error,
+            })
+
+    def stage(self, name, bytes=0, pages=0):
+        """
+        Time a block. The yielded dict can be updated with "bytes"/"pages" once they are known.
+        """
+        if not self.enabled:
+            return _DISABLED_STAGE
+        return self._timed_stage(name, bytes, pages)
+
+    @contextlib.contextmanager
+    def _timed_stage(self, name, bytes, pages):
+        info = {"bytes": bytes, "pages": pages}
+        start = time.perf_counter()
+        try:
+            yield info
+        except BaseException as e:
+            self.record(name, time.perf_counter() - start, error=type(e).__name__, bytes=info["bytes"], pages=info["pages"])
+            raise
+        self.record(name, time.perf_counter() - start, bytes=info["bytes"], pages=info["pages"])
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: {
+                    "count": s.count,
+                    "errors": s.errors,
+                    "seconds": s.seconds,
+                    "avg_seconds": s.seconds / s.count if s.count else 0.0,
+                    "max_seconds": s.max_seconds,
+                    "bytes": s.bytes,
+                    "pages": s.pages,
+                }
+                for name, s in sorted(self._stages.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._recent.clear()
+
+    def to_prometheus(self, prefix="taktak"):
+        lines = []
+        series = (
+            ("stage_calls_total", "counter", "count"),
+            ("stage_errors_total", "counter", "errors"),
+            ("stage_seconds_total", "counter", "seconds"),
+            ("stage_max_seconds", "gauge", "max_seconds"),
+            ("stage_bytes_total", "counter", "bytes"),
+            ("stage_pages_total", "counter", "pages"),
+        )
+        snapshot = self.snapshot()
+        for metric, kind, field in series:
+            lines.append(f"# TYPE {prefix}_{metric} {kind}")
+            for name, values in snapshot.items():
+                lines.append(f'{prefix}_{metric}{{stage="{name}"}} {values[field]}')
+        return "\n".join(lines) + "\n"
+
+    def to_json_lines(self):
+        with self._lock:
+            return "".join(json.dumps(event) + "\n" for event in self._recent)
+
+
+METRICS = Metrics()
+stage = METRICS.stage
+
+
+def profile_report(profiler, sort="cumulative", limit=40):
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+def profile_call(fn, *args, sort="cumulative", limit=40, **kwargs):
+    """Run fn under cProfile; returns (result, text report)."""
+    profiler = cProfile.Profile()
+    result = profiler.runcall(fn, *args, **kwargs)
+    return result, profile_report(profiler, sort=sort, limit=limit)
@@ -0,0 +1,227 @@
+import functools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from metrics import METRICS
+
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def process_context():
+    """
+    Start method for worker pools. Forking a multi-threaded Streamlit server (job, warm-up and
+    index threads) is unsafe, so workers start from a clean interpreter instead.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _init_worker():
+    # One Tesseract thread per worker process; the pool provides the parallelism
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+@functools.lru_cache(maxsize=None)
+def tesseract_info():
+    """Tesseract version and installed languages, probed once per process; None when missing."""
+    import pytesseract
+
+    try:
+        return {
+            "version": str(pytesseract.get_tesseract_version()),
+            "languages": frozenset(pytesseract.get_languages(config="")),
+        }
+    except (pytesseract.TesseractNotFoundError, OSError):
+        return None
+
+
+def warm_up():
+    # pdf2image and pytesseract (which pulls in pandas) are the slow imports on this path
+    import pdf2image  # noqa: F401
+
+    tesseract_info()
+
+
+# Adaptive mode renders at the first DPI and only moves up while the page's mean word
+# confidence stays under MIN_CONFIDENCE
+ADAPTIVE_DPIS = (150, 300)
+MIN_CONFIDENCE = 70.0
+
+
+class OcrPage:
+    __slots__ = ("page", "text", "dpi", "confidence", "render_seconds", "ocr_seconds", "attempts")
+
+    def __init__(self, page, text, dpi, confidence=None, render_seconds=0.0, ocr_seconds=0.0, attempts=()):
+        self.page = page
+        self.text = text
+        self.dpi = dpi
+        self.confidence = confidence
+        self.render_seconds = render_seconds
+        self.ocr_seconds = ocr_seconds
+        # (dpi, confidence) for every pass, including the final one
+        self.attempts = tuple(attempts)
+
+    @property
+    def seconds(self):
+        return self.render_seconds + self.ocr_seconds
+
+    def as_dict(self):
+        return {
+            "page": self.page,
+            "dpi": self.dpi,
+            "confidence": self.confidence,
+            "seconds": self.seconds,
+            "attempts": [list(a) for a in self.attempts],
+        }
+
+
+def otsu_threshold(histogram):
+    """Threshold that best separates a 256-bin grayscale histogram into ink and paper."""
+    total = sum(histogram)
+    if not total:
+        return 128
+    weighted_total = sum(i * n for i, n in enumerate(histogram))
+    background = weighted = 0
+    best, threshold = -1.0, 128
+    for i, n in enumerate(histogram):
+        background += n
+        if not background:
+            continue
+        foreground = total - background
+        if not foreground:
+            break
+        weighted += i * n
+        mean_background = weighted / background
+        mean_foreground = (weighted_total - weighted) / foreground
+        between = background * foreground * (mean_background - mean_foreground) ** 2
+        if between > best:
+            best, threshold = between, i
+    return threshold
+
+
+def binarize(image):
+    gray = image.convert("L")
+    threshold = otsu_threshold(gray.histogram())
+    return gray.point(lambda v: 255 if v > threshold else 0)
+
+
+def text_and_confidence(data):
+    """Rebuild page text from image_to_data output; confidence is the mean over words, weighted by length."""
+    lines = {}
+    weighted = chars = 0.0
+    for i, word in enumerate(data["text"]):
+        word = (word or "").strip()
+        conf = float(data["conf"][i])
+        if not word or conf < 0:
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append(word)
+        weighted += conf * len(word)
+        chars += len(word)
+    out = []
+    previous = None
+    for key in sorted(lines):
+        if previous is not None:
+            # New block or paragraph gets a blank line, like image_to_string
+            out.append("\n\n" if key[:2] != previous[:2] else "\n")
+        out.append(" ".join(lines[key]))
+        previous = key
+    return "".join(out), (weighted / chars if chars else 0.0)
+
+
+def _ocr_page_timed(pdf_path, page, lang="eng", dpi=300):
+    # Runs in worker processes, so timings travel back with the result
+    import pytesseract
+    from pdf2image import convert_from_path
+
+    start = time.perf_counter()
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=page, last_page=page)
+    rendered = time.perf_counter()
+    text = pytesseract.image_to_string(images[0], lang=lang) if images else ""
+    return OcrPage(
+        page, text, dpi, render_seconds=rendered - start, ocr_seconds=time.perf_counter() - rendered,
+        attempts=[(dpi, None)],
+    )
+
+
+def _ocr_page_adaptive(pdf_path, page, lang="eng", dpis=ADAPTIVE_DPIS, min_confidence=MIN_CONFIDENCE):
+    import pytesseract
+    from pdf2image import convert_from_path
+
+    best = None
+    attempts = []
+    render_seconds = ocr_seconds = 0.0
+    for dpi in dpis:
+        start = time.perf_counter()
+        images = convert_from_path(pdf_path, dpi=dpi, first_page=page, last_page=page, grayscale=True)
+        rendered = time.perf_counter()
+        render_seconds += rendered - start
+        if not images:
+            break
+        data = pytesseract.image_to_data(binarize(images[0]), lang=lang, output_type=pytesseract.Output.DICT)
+        text, confidence = text_and_confidence(data)
+        ocr_seconds += time.perf_counter() - rendered
+        attempts.append((dpi, round(confidence, 1)))
+        if best is None or confidence > best[2]:
+            best = (text, dpi, confidence)
+        if confidence >= min_confidence:
+            break
+    if best is None:
+        return OcrPage(page, "", dpis[0], attempts=attempts)
+    text, dpi, confidence = best
+    return OcrPage(page, text, dpi, confidence, render_seconds, ocr_seconds, attempts)
+
+
+def ocr_pages_detailed(pdf_path, pages, lang="eng", dpi=300, max_workers=None, adaptive=False,
+                       dpis=ADAPTIVE_DPIS, min_confidence=MIN_CONFIDENCE, on_page=None):
+    """
+    Rasterize and OCR exactly the given pages; returns [OcrPage] in page order.
+
+    lang is a Tesseract language code, or a {page: code} dict to OCR each page in its own language.
+    With adaptive=True, pages are grayscaled and binarized, OCR'd at dpis[0] and re-run at the
+    next DPI only while their mean word confidence is below min_confidence; dpi is ignored.
+    on_page(OcrPage) is called as each page finishes; if it raises (e.g. a cancelled job),
+    pages not yet started are dropped and the exception propagates.
+    """
+    pages = sorted(set(pages))
+    if not pages:
+        return []
+    langs = [lang.get(p, "eng") if isinstance(lang, dict) else lang for p in pages]
+    n = len(pages)
+    if adaptive:
+        fn, extra = _ocr_page_adaptive, ([tuple(dpis)] * n, [min_confidence] * n)
+    else:
+        fn, extra = _ocr_page_timed, ([dpi] * n,)
+    workers = min(max_workers or available_cores(), n)
+    args = list(zip([pdf_path] * n, pages, langs, *extra))
+    if workers <= 1:
+        results = []
+        for task in args:
+            results.append(fn(*task))
+            if on_page is not None:
+                on_page(results[-1])
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=process_context(), initializer=_init_worker)
+        try:
+            futures = [pool.submit(fn, *task) for task in args]
+            for future in as_completed(futures):
+                if on_page is not None:
+                    on_page(future.result())
+            results = [future.result() for future in futures]
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    if METRICS.enabled:
+        for result in results:
+            METRICS.record("ocr.pdf2image", result.render_seconds, pages=1)
+            METRICS.record("ocr.tesseract", result.ocr_seconds, pages=1, bytes=len(result.text))
+            if len(result.attempts) > 1:
+                METRICS.record("ocr.escalated", 0.0, pages=1)
+    return results
@@ -0,0 +1,120 @@
+import io
+import mmap
+import os
+import tempfile
+import threading
+import time
+import weakref
+
+from pypdf import PdfReader
+
+from disk_cache import DEFAULT_CACHE_DIR, hash_bytes, hash_file
+from metrics import stage
+
+DOCUMENTS_DIR = os.path.join(DEFAULT_CACHE_DIR, "documents")
+# Copies are deleted with their PdfDocument; this only catches ones a crashed process left behind
+STALE_COPY_SECONDS = 24 * 3600
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def prune_document_copies(max_age=STALE_COPY_SECONDS, folder=DOCUMENTS_DIR):
+    """Delete on-disk copies of uploads not used for max_age seconds; returns how many."""
+    now = time.time()
+    try:
+        entries = list(os.scandir(folder))
+    except OSError:
+        return 0
+    removed = 0
+    for entry in entries:
+        try:
+            if now - entry.stat().st_mtime >= max_age:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+class PdfDocument:
+    """
+    One parsed PDF shared by extraction, OCR and previews.
+
+    The bytes are parsed once with pypdf; page count, page objects and per-page text
+    are cached on the instance. Tools that need a file path (pdf2image, OCR worker
+    processes) get a private copy under the cache directory, deleted when the
+    document is garbage collected.
+    """
+
+    def __init__(self, buffer, sha256, path=None):
+        self.sha256 = sha256
+        self._buffer = buffer
+        self._path = path
+        self._copy = None
+        self._lock = threading.Lock()
+        with stage("pdf.parse", bytes=len(buffer)):
+            self.reader = PdfReader(io.BytesIO(buffer) if isinstance(buffer, (bytes, bytearray)) else buffer)
+            self.page_count = len(self.reader.pages)
+        self._text = {}
+
+    @classmethod
+    def from_bytes(cls, data, sha256=None):
+        return cls(bytes(data), sha256 or hash_bytes(data))
+
+    @classmethod
+    def from_path(cls, path, sha256=None):
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer, sha256 or hash_file(path), path=os.path.abspath(path))
+
+    @property
+    def path(self):
+        if self._path is None or not self._copy_in_use():
+            with self._lock:
+                if self._path is None or not self._copy_in_use():
+                    self._path = self._write_copy()
+        return self._path
+
+    def _copy_in_use(self):
+        """True unless this document's copy was pruned; refreshes its age otherwise."""
+        if self._copy is None:
+            return True
+        try:
+            os.utime(self._path)
+        except OSError:
+            return False
+        return True
+
+    def _write_copy(self):
+        os.makedirs(DOCUMENTS_DIR, exist_ok=True)
+        prune_document_copies()
+        fd, path = tempfile.mkstemp(prefix=f"{self.sha256[:16]}-", suffix=".pdf", dir=DOCUMENTS_DIR)
+        with os.fdopen(fd, "wb") as f:
+            f.write(self._buffer)
+        if self._copy is not None:
+            self._copy.detach()
+        self._copy = weakref.finalize(self, _remove, path)
+        return path
+
+    def close(self):
+        """Delete the on-disk copy now instead of when the document is garbage collected."""
+        if self._copy is not None:
+            self._copy()
+
+    def page(self, number):
+        return self.reader.pages[number - 1]
+
+    def page_text(self, number):
+        if number not in self._text:
+            # pypdf page objects are not safe to parse from several threads at once
+            with self._lock:
+                if number not in self._text:
+                    with stage("pdf.page_text", pages=1) as info:
+                        self._text[number] = self.page(number).extract_text() or ""
+                        info["bytes"] = len(self._text[number])
+        return self._text[number]
@@ -0,0 +1,194 @@
+import functools
+import os
+import re
+
+from bidi.algorithm import get_display
+
+from metrics import stage
+
+# First existing file wins; TAKTAK_PDF_FONT points at any TTF with the scripts you need
+FONT_CANDIDATES = (
+    os.environ.get("TAKTAK_PDF_FONT", ""),
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+)
+
+RTL_RE = re.compile("[\u0590-\u08ff\ufb1d-\ufdff\ufe70-\ufefc]")
+
+
+@functools.lru_cache(maxsize=None)
+def unicode_font_path():
+    for path in FONT_CANDIDATES:
+        if path and os.path.isfile(path):
+            return path
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def has_text_shaping():
+    try:
+        import uharfbuzz  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@functools.lru_cache(maxsize=None)
+def arabic_reshaper():
+    # Fallback when HarfBuzz is missing: joins Arabic letters into their presentation forms
+    try:
+        import arabic_reshaper
+    except ImportError:
+        return None
+    return arabic_reshaper.reshape
+
+
+def warm_up():
+    import fpdf  # noqa: F401
+
+    unicode_font_path()
+
+
+def iter_lines(text):
+    # Walks the text in place instead of building a list of every line
+    start = 0
+    while start <= len(text):
+        end = text.find("\n", start)
+        if end == -1:
+            end = len(text)
+        yield text[start:end]
+        start = end + 1
+
+
+class TextPdfWriter:
+    """
+    Lays text out into an fpdf2 document with an embedded Unicode font.
+
+    Lines are wrapped here with cached word widths and placed with pdf.text(), which
+    is far cheaper than one multi_cell() call per line on long documents. fpdf2 subsets
+    the TTF to the glyphs actually used, so the output stays small; the document itself
+    is held in memory until output(). pdf.text() neither shapes nor reorders, so
+    right-to-left rows go through cell(), which runs HarfBuzz and the bidi algorithm
+    when uharfbuzz is installed; otherwise arabic-reshaper and python-bidi put them
+    in visual order first. Either way they are right-aligned.
+    """
+
+    # Caps the word-width cache; distinct words in a long export would otherwise all stay cached
+    MAX_CACHED_WIDTHS = 50000
+
+    def __init__(self, font_path=None, font_size=11, line_height=6, margin=15):
+        from fpdf import FPDF
+
+        self.pdf = FPDF()
+        self.pdf.set_auto_page_break(auto=False)
+        self.pdf.set_margins(margin, margin, margin)
+        self.line_height = line_height
+        self.margin = margin
+        font_path = font_path or unicode_font_path()
+        self.unicode = font_path is not None
+        self.shaping = False
+        if self.unicode:
+            self.pdf.add_font("Body", fname=font_path)
+            self.pdf.set_font("Body", size=font_size)
+            if has_text_shaping():
+                self.pdf.set_text_shaping(True)
+                self.shaping = True
+        else:
+            self.pdf.set_font("Helvetica", size=font_size)
+        self._widths = {}
+        self.space = self.width(" ")
+        self.y = None
+
+    def width(self, word):
+        w = self._widths.get(word)
+        if w is None:
+            if len(self._widths) >= self.MAX_CACHED_WIDTHS:
+                self._widths.clear()
+            w = self._widths[word] = self.pdf.get_string_width(word)
+        return w
+
+    def wrap(self, line):
+        """Greedy word wrap to the page width; yields (text, width) per output row."""
+        max_width = self.pdf.epw
+        row, row_width = [], 0.0
+        for word in line.split(" "):
+            w = self.width(word)
+            if w > max_width:
+                # A single word wider than the page is broken by characters
+                if row:
+                    yield " ".join(row), row_width
+                    row, row_width = [], 0.0
+                piece = ""
+                for char in word:
+                    if piece and self.width(piece + char) > max_width:
+                        yield piece, self.width(piece)
+                        piece = ""
+                    piece += char
+                word, w = piece, self.width(piece)
+            if row and row_width + self.space + w > max_width:
+                yield " ".join(row), row_width
+                row, row_width = [], 0.0
+            row_width = row_width + self.space + w if row else w
+            row.append(word)
+        yield " ".join(row), row_width
+
+    def newline(self):
+        if self.y is None or self.y + self.line_height > self.pdf.h - self.margin:
+            self.pdf.add_page()
+            self.y = self.margin
+        self.y += self.line_height
+
+    def write_line(self, line):
+        if not self.unicode:
+            line = line.encode("latin-1", "replace").decode("latin-1")
+        if not line.strip():
+            self.newline()
+            return
+        rtl = RTL_RE.search(line) is not None
+        reshape = arabic_reshaper() if rtl and not self.shaping else None
+        if reshape is not None:
+            # Before wrapping, so rows are measured with the joined glyphs they are drawn with
+            line = reshape(line)
+        for row, row_width in self.wrap(line):
+            self.newline()
+            if rtl and self.shaping:
+                # cell() takes its top edge; place it so the baseline matches the pdf.text() rows
+                self.pdf.set_xy(self.margin, self.y - self.line_height / 2 - 0.3 * self.pdf.font_size)
+                self.pdf.cell(w=self.pdf.epw + self.pdf.c_margin, h=self.line_height, text=row, align="R")
+                continue
+            if rtl:
+                row = get_display(row)
+                x = self.pdf.w - self.margin - row_width
+            else:
+                x = self.margin
+            self.pdf.text(x, self.y, row)
+
+    def write(self, text):
+        for line in iter_lines(text):
+            self.write_line(line)
+        if self.y is None:
+            self.pdf.add_page()
+
+    def output(self, out=None):
+        """Returns the PDF bytes, or writes them to out (a path or binary file object)."""
+        data = bytes(self.pdf.output())
+        if out is None:
+            return data
+        if isinstance(out, (str, os.PathLike)):
+            with open(out, "wb") as f:
+                f.write(data)
+        else:
+            out.write(data)
+        return out
+
+
+def export_text_to_pdf(text, out=None, font_path=None):
+    with stage("export.pdf", bytes=len(text)) as info:
+        writer = TextPdfWriter(font_path=font_path)
+        writer.write(text)
+        info["pages"] = writer.pdf.page
+        return writer.output(out)
@@ -0,0 +1,120 @@
+import math
+import re
+import zlib
+from collections import Counter
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def estimate_tokens(text):
+    # Rough LLM token estimate; ~4 characters per token for Latin scripts
+    return max(1, len(text) // 4)
+
+
+class HashingEmbedder:
+    """Model-free embeddings: hashed unigrams and bigrams, L2-normalized."""
+
+    def __init__(self, dim=1024):
+        self.dim = dim
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                h = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class OllamaEmbedder:
+    def __init__(self, model="nomic-embed-text"):
+        from langchain_community.embeddings import OllamaEmbeddings
+
+        self._client = OllamaEmbeddings(model=model)
+
+    def embed(self, texts):
+        vectors = np.asarray(self._client.embed_documents(list(texts)), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class BM25Index:
+    def __init__(self, documents_tokens, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths = np.array([len(t) for t in documents_tokens], dtype=np.float32)
+        self.avg_length = float(self.doc_lengths.mean()) if len(documents_tokens) else 0.0
+        self.postings = {}
+        for doc_id, tokens in enumerate(documents_tokens):
+            for term, tf in Counter(tokens).items():
+                self.postings.setdefault(term, []).append((doc_id, tf))
+        n = len(documents_tokens)
+        self.idf = {
+            term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+            for term, p in self.postings.items()
+        }
+
+    def scores(self, query_tokens):
+        scores = np.zeros(len(self.doc_lengths), dtype=np.float32)
+        if not self.avg_length:
+            return scores
+        for term in set(query_tokens):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf[term]
+            for doc_id, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+
+class ChunkRetriever:
+    """
+    Hybrid BM25 + embedding retrieval over text chunks.
+
+    With embedder=None only BM25 is used; HashingEmbedder needs no model server either.
+    """
+
+    def __init__(self, chunks, metadatas=None, embedder=None, alpha=0.5):
+        self.chunks = list(chunks)
+        self.metadatas = list(metadatas) if metadatas is not None else [{} for _ in self.chunks]
+        self.embedder = embedder
+        self.alpha = alpha
+        self.bm25 = BM25Index([tokenize(c) for c in self.chunks])
+        self.vectors = embedder.embed(self.chunks) if embedder is not None and self.chunks else None
+
+    def search(self, query, k=8, token_budget=3000):
+        """Return up to k (chunk, metadata, score) in relevance order, within token_budget."""
+        if not self.chunks:
+            return []
+        scores = self.bm25.scores(tokenize(query))
+        top = scores.max()
+        if top > 0:
+            scores = scores / top
+        if self.vectors is not None:
+            query_vector = self.embedder.embed([query])[0]
+            scores = self.alpha * scores + (1 - self.alpha) * (self.vectors @ query_vector)
+
+        results = []
+        used = 0
+        for idx in np.argsort(-scores, kind="stable"):
+            if len(results) >= k:
+                break
+            cost = estimate_tokens(self.chunks[idx])
+            if used + cost > token_budget:
+                continue
+            used += cost
+            results.append((self.chunks[idx], self.metadatas[idx], float(scores[idx])))
+        return results
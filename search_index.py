@@ -0,0 +1,163 @@
+import bisect
+import html
+import re
+import threading
+from array import array
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+MAX_PREFIX_TERMS = 50
+
+
+def tokenize(text):
+    return [m.group().casefold() for m in TOKEN_RE.finditer(text)]
+
+
+class InvertedIndex:
+    """
+    Positional inverted index over documents identified by arbitrary hashable ids.
+
+    Every token keeps its position and character offsets, so phrase queries are
+    answered from postings and matches are highlighted without re-scanning text.
+    Offsets are reported relative to the text passed to add(), plus base_offset.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self._starts = {}
+        self._ends = {}
+        self._doc_terms = {}
+        self._vocabulary = None
+        self._lock = threading.RLock()
+
+    def __contains__(self, doc_id):
+        return doc_id in self._starts
+
+    def __len__(self):
+        return len(self._starts)
+
+    def add(self, doc_id, text, base_offset=0):
+        with self._lock:
+            if doc_id in self._starts:
+                self.remove(doc_id)
+            starts, ends = array("L"), array("L")
+            doc_postings = {}
+            for position, match in enumerate(TOKEN_RE.finditer(text)):
+                starts.append(base_offset + match.start())
+                ends.append(base_offset + match.end())
+                term = match.group().casefold()
+                positions = doc_postings.get(term)
+                if positions is None:
+                    positions = doc_postings[term] = array("L")
+                positions.append(position)
+            for term, positions in doc_postings.items():
+                self.postings.setdefault(term, {})[doc_id] = positions
+            self._starts[doc_id] = starts
+            self._ends[doc_id] = ends
+            self._doc_terms[doc_id] = tuple(doc_postings)
+            self._vocabulary = None
+
+    def remove(self, doc_id):
+        with self._lock:
+            for term in self._doc_terms.pop(doc_id, ()):
+                docs = self.postings.get(term)
+                if docs is not None:
+                    docs.pop(doc_id, None)
+                    if not docs:
+                        del self.postings[term]
+            self._starts.pop(doc_id, None)
+            self._ends.pop(doc_id, None)
+            self._vocabulary = None
+
+    def _expand_prefix(self, prefix):
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        i = bisect.bisect_left(self._vocabulary, prefix)
+        terms = []
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(prefix) and len(terms) < MAX_PREFIX_TERMS:
+            terms.append(self._vocabulary[i])
+            i += 1
+        return terms
+
+    def search(self, query, prefix=True):
+        """
+        Return {doc_id: [(start, end), ...]} for a term or phrase query.
+
+        With prefix=True the last query token also matches longer words, so results
+        stay useful while the query is still being typed.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return {}
+        with self._lock:
+            alternatives = [[t] for t in tokens]
+            if prefix:
+                alternatives[-1] = self._expand_prefix(tokens[-1]) or [tokens[-1]]
+
+            # Per token: doc_id -> set of positions, merged over prefix alternatives
+            per_token = []
+            for terms in alternatives:
+                merged = {}
+                for term in terms:
+                    for doc_id, positions in self.postings.get(term, {}).items():
+                        merged.setdefault(doc_id, set()).update(positions)
+                if not merged:
+                    return {}
+                per_token.append(merged)
+
+            candidates = set(per_token[0])
+            for merged in per_token[1:]:
+                candidates &= merged.keys()
+
+            results = {}
+            n = len(tokens)
+            for doc_id in candidates:
+                starts, ends = self._starts[doc_id], self._ends[doc_id]
+                spans = []
+                for position in sorted(per_token[0][doc_id]):
+                    if all(position + k in per_token[k][doc_id] for k in range(1, n)):
+                        spans.append((starts[position], ends[position + n - 1]))
+                if spans:
+                    results[doc_id] = spans
+            return results
+
+    def counts(self, query, prefix=True):
+        return {doc_id: len(spans) for doc_id, spans in self.search(query, prefix=prefix).items()}
+
+
+def highlight(text, spans, offset=0, before="<mark>", after="</mark>", escape=False):
+    """Wrap spans (absolute offsets, text starting at offset) in markers, building the output from slices."""
+    quote = html.escape if escape else (lambda s: s)
+    parts = []
+    cursor = 0
+    for start, end in sorted(spans):
+        start, end = start - offset, end - offset
+        if start < cursor or end > len(text):
+            continue
+        parts.append(quote(text[cursor:start]))
+        parts.append(before + quote(text[start:end]) + after)
+        cursor = end
+    parts.append(quote(text[cursor:]))
+    return "".join(parts)
+
+
+class FolderSearchIndex:
+    """InvertedIndex over a folder's files that only re-indexes files whose hash changed."""
+
+    def __init__(self):
+        self.index = InvertedIndex()
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    def sync(self, hashes, load_text):
+        """hashes: {name: sha256} for the current files; load_text(name) is only called for changed files."""
+        with self._lock:
+            for name, sha256 in hashes.items():
+                if self._hashes.get(name) != sha256:
+                    self.index.add(name, load_text(name) or "")
+                    self._hashes[name] = sha256
+            for name in set(self._hashes) - set(hashes):
+                self.index.remove(name)
+                del self._hashes[name]
+
+    def counts(self, query):
+        return self.index.counts(query)
@@ -1,17 +1,31 @@
 import streamlit as st
-import re
-import tempfile
-import base64
-import pdfplumber
-from pypdf import PdfReader
-from PIL import Image
-from fpdf import FPDF
-import io
-from gtts import gTTS
 from bidi.algorithm import get_display
-from langdetect import detect, LangDetectException
-from pdf2image import convert_from_path
-import pytesseract
+from thumbnails import ThumbnailService, paginate
+from pdf_document import PdfDocument
+from document_model import SOURCE_TEXT
+from search_index import InvertedIndex, highlight
+from disk_cache import hash_bytes
+from diagnostics import finish_rerun_profile, render_diagnostics_panel, start_rerun_profile
+import language
+import ocr_engine
+import pdf_export
+import tts_pipeline
+from pdf_export import export_text_to_pdf
+from warmup import warm_up_in_background
+from jobs import DONE
+from job_ui import clear_cancelled, job_progress, start_job, tracked_job, was_cancelled
+from tts_engines import available_engines, get_engine
+from audio_player import render_playlist
+from audio_segments import AudioPlaylist
+from tts_pipeline import split_sections
+from audiobook import (
+    TESSERACT_LANG_MAP,
+    document_language,
+    extract_text_from_pdf,
+    shared_text_cache,
+    sections_playlist_dir,
+    synthesize_sections_to_playlist,
+)
 
 st.set_page_config(
     page_title="Peepit Audiobook",
@@ -69,77 +83,80 @@ TTS_LANGUAGES = {
     "German 🇩🇪": "de"
 }
 
-TESSERACT_LANG_MAP = {
-    'en': 'eng',
-    'ar': 'ara',
-    'es': 'spa',
-    'fr': 'fra',
-    'de': 'deu'
-}
-
-def detect_content_language(text):
-    try:
-        if len(text) < 10:
-            return 'en'
-        return detect(text)
-    except LangDetectException:
-        return 'en'
-
-def extract_text_with_ocr(pdf_path, pages, lang='eng'):
-    text = ""
-    images = convert_from_path(pdf_path, dpi=300, first_page=min(pages), last_page=max(pages))
-    for i, img in zip(pages, images):
-        text += f"--- Page {i} (OCR) ---\n"
-        text += pytesseract.image_to_string(img, lang=lang)
-        text += "\n\n"
-    return text
-
-def extract_text_from_pdf(pdf_path, selected_pages):
-    reader = PdfReader(pdf_path)
-    extracted_text = ""
-    pages_without_text = []
-
-    for i in selected_pages:
-        if i < 1 or i > len(reader.pages):
-            continue
-        page = reader.pages[i - 1]
-        text = page.extract_text()
-        if text and text.strip():
-            extracted_text += f"--- Page {i} ---\n{text}\n\n"
-        else:
-            pages_without_text.append(i)
-
-    valid_ocr_pages = [p for p in pages_without_text if 1 <= p <= len(reader.pages)]
-    if valid_ocr_pages:
-        st.warning(f"🔍 Running OCR on pages: {valid_ocr_pages}")
-        content_lang = detect_content_language(extracted_text)
-        ocr_lang = TESSERACT_LANG_MAP.get(content_lang, 'eng')
-        ocr_text = extract_text_with_ocr(pdf_path, valid_ocr_pages, lang=ocr_lang)
-        extracted_text += ocr_text
-
-    return extracted_text.strip(), valid_ocr_pages
-
-def generate_audio(text, lang="en"):
-    try:
-        tts = gTTS(text=text, lang=lang, slow=False)
-        temp_audio_path = tempfile.mktemp(suffix=".mp3")
-        tts.save(temp_audio_path)
-        return temp_audio_path
-    except Exception as e:
-        st.error(f"Audio generation failed: {str(e)}")
-        return None
-
-def export_text_to_pdf(text):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.set_font("Arial", size=12)
-    lines = text.split('\n')
-    for line in lines:
-        pdf.multi_cell(0, 10, line)
-    temp_path = tempfile.mktemp(suffix=".pdf")
-    pdf.output(temp_path)
-    return temp_path
+# Page previews: thumbnails per preview page is PREVIEW_ROWS x previews per row
+PREVIEW_ROWS = 2
+PREVIEW_CONTENT_WIDTH = 1200
+
+@st.cache_resource
+def warm_up():
+    # Once per server process: langdetect profiles, the Tesseract probe and the PDF/TTS imports
+    return warm_up_in_background(
+        ("langdetect", language.warm_up),
+        ("ocr", ocr_engine.warm_up),
+        ("pdf_export", pdf_export.warm_up),
+        ("gtts", tts_pipeline.warm_up),
+    )
+
+@st.cache_resource
+def get_thumbnail_service():
+    return ThumbnailService()
+
+@st.cache_resource(max_entries=8)
+def open_document(doc_hash, _pdf_bytes):
+    # Keyed by content hash only; the bytes themselves are not hashed again
+    return PdfDocument.from_bytes(_pdf_bytes, sha256=doc_hash)
+
+@st.cache_resource(max_entries=4)
+def get_search_index(index_key, _extracted):
+    # Built once per extracted document; doc ids are page numbers, offsets index into extracted.text
+    index = InvertedIndex()
+    for segment in _extracted.segments:
+        index.add(segment.page, _extracted.body(segment), base_offset=segment.body_start)
+    return index
+
+def run_extraction(job, document, selected_pages):
+    job.update(message=f"{len(selected_pages)} page(s)")
+    ocr_report = {}
+    text_pages = []
+
+    def on_text_page(page):
+        job.check_cancelled()
+        text_pages.append(page)
+        job.update(progress=0.2 * len(text_pages) / len(selected_pages), message=f"reading page {page}")
+
+    def on_ocr_page(result):
+        # Raising here stops the OCR pool from starting the remaining pages
+        job.check_cancelled()
+        # A page re-OCR'd in another language replaces its first report
+        ocr_report[result.page] = result.as_dict()
+        job.update(progress=0.2 + 0.8 * len(ocr_report) / len(selected_pages), message=f"OCR page {result.page} at {result.dpi} dpi")
+
+    extracted, ocr_pages = extract_text_from_pdf(
+        document,
+        selected_pages,
+        on_ocr=lambda pages: job.update(progress=0.2, message=f"running OCR on pages {pages}"),
+        on_ocr_page=on_ocr_page,
+        on_text_page=on_text_page,
+    )
+    return extracted, ocr_pages, [ocr_report[p] for p in sorted(ocr_report)]
+
+def run_audio(job, sections, lang="en", engine=None):
+    chunks = split_sections(sections)
+    total = max(1, len(chunks))
+
+    def on_chunk(index, audio):
+        job.check_cancelled()
+        job.update(progress=(index + 1) / total, message=f"{index + 1}/{total} chunks")
+
+    def on_segment(playlist):
+        # The job only carries the playlist's directory; the audio itself stays on disk
+        job.update(partial=playlist.directory)
+
+    directory = sections_playlist_dir(sections, lang=lang, engine=engine)
+    playlist, stats = synthesize_sections_to_playlist(
+        sections, directory, lang=lang, engine=engine, on_chunk=on_chunk, on_segment=on_segment, chunks=chunks
+    )
+    return playlist.directory, stats
 
 # --- MAIN APP ---
 def main():
@@ -160,105 +177,177 @@ def main():
     # Sidebar
     tts_lang = st.sidebar.selectbox("Speaker Language", list(TTS_LANGUAGES.keys()), index=0)
     tts_lang_code = TTS_LANGUAGES[tts_lang]
+    tts_engine = st.sidebar.selectbox(
+        "Voice Engine",
+        [None] + available_engines(),
+        format_func=lambda name: "Auto" if name is None else get_engine(name).label,
+        help="Offline engines synthesize on this machine; Auto follows TAKTAK_TTS_ENGINES, then gTTS.",
+    )
+
+    cache_stats = shared_text_cache().stats()
+    st.sidebar.caption(
+        f"Text cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses, "
+        f"{cache_stats['bytes'] / 1e6:.1f} MB"
+    )
 
     uploaded_file = st.file_uploader("📤 Upload PDF", type=["pdf"])
     url_link = st.text_input("🔗 Optional: Public URL to the document", placeholder="https://www.peepit.io/example.pdf")
 
-    pdf_path = None
     if uploaded_file:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            tmp.write(uploaded_file.getvalue())
-            pdf_path = tmp.name
-
-        with pdfplumber.open(pdf_path) as pdf:
-            total_pages = len(pdf.pages)
-            selected_pages = st.multiselect("Select pages to process", list(range(1, total_pages + 1)), default=[1])
+        pdf_bytes = uploaded_file.getvalue()
+        # Hash each upload once, not on every rerun
+        if st.session_state.get("upload_file_id") != uploaded_file.file_id:
+            st.session_state.upload_file_id = uploaded_file.file_id
+            st.session_state.upload_hash = hash_bytes(pdf_bytes)
+        document = open_document(st.session_state.upload_hash, pdf_bytes)
+        total_pages = document.page_count
+        selected_pages = st.multiselect("Select pages to process", list(range(1, total_pages + 1)), default=[1])
 
         if not selected_pages:
             st.error("Please select at least one valid page")
             return
 
-        with st.spinner("🔍 Analyzing document..."):
-            full_text, ocr_pages = extract_text_from_pdf(pdf_path, selected_pages)
-            if not full_text:
-                st.error("No extractable text found")
+        # Extraction runs as a background job so widget changes don't restart it
+        extract_key = (document.sha256, tuple(sorted(set(selected_pages))))
+        job = tracked_job("extract_job", "extract", extract_key)
+        if job is None:
+            if was_cancelled("extract_job", "extract", extract_key):
+                st.info("Analysis cancelled.")
+                if st.button("🔁 Analyze again"):
+                    clear_cancelled("extract_job")
+                    st.rerun()
                 return
+            job = start_job("extract_job", "extract", extract_key, run_extraction, document, selected_pages)
+        if not job_progress("extract_job", job, "🔍 Analyzing document..."):
+            return
+        if job.state != DONE:
+            st.error(f"Analysis failed: {job.error or job.state}")
+            return
+        extracted, ocr_pages, ocr_report = job.result
+        if ocr_pages:
+            st.warning(f"🔍 OCR was used for pages: {ocr_pages}")
+            with st.expander("OCR details", expanded=False):
+                st.table([
+                    {
+                        "page": r["page"],
+                        "dpi": r["dpi"],
+                        "confidence": None if r["confidence"] is None else round(r["confidence"], 1),
+                        "seconds": round(r["seconds"], 2),
+                        "passes": len(r["attempts"]) or "cached",
+                    }
+                    for r in ocr_report
+                ])
+        full_text = extracted.text
+        if not full_text:
+            st.error("No extractable text found")
+            return
 
-            content_lang = detect_content_language(full_text)
-            if content_lang not in TESSERACT_LANG_MAP:
-                st.warning(f"Unsupported content language detected: {content_lang}", icon="⚠️")
-
-            col_left, col_right = st.columns(2)
-
-            with col_left:
-                with st.expander("📜 Extracted Text", expanded=True):
-                    search_term = st.text_input("🔎 Search within text", "")
-                    show_ocr = st.checkbox("👁️ Show OCR text", value=True)
-
-                    filtered_text = full_text
-                    if not show_ocr and ocr_pages:
-                        pattern = r"--- Page (\d+).*?(?=(--- Page |\Z))"
-                        filtered = re.findall(pattern, full_text, re.DOTALL)
-                        filtered_text = "\n\n".join(
-                            section for section, _ in filtered if int(section) not in ocr_pages
-                        )
-
-                    if search_term:
-                        filtered_text = re.sub(
-                            f"(?i)({re.escape(search_term)})",
-                            r"<mark>\1</mark>",
-                            filtered_text,
-                            flags=re.DOTALL,
+        content_lang = document_language(extracted)
+        if content_lang not in TESSERACT_LANG_MAP:
+            st.warning(f"Unsupported content language detected: {content_lang}", icon="⚠️")
+
+        col_left, col_right = st.columns(2)
+
+        with col_left:
+            with st.expander("📜 Extracted Text", expanded=True):
+                search_term = st.text_input("🔎 Search within text", "")
+                show_ocr = st.checkbox("👁️ Show OCR text", value=True)
+
+                visible_segments = extracted.segments
+                if not show_ocr and ocr_pages:
+                    visible_segments = extracted.select(sources={SOURCE_TEXT})
+                filtered_text = extracted.join(visible_segments)
+
+                # Highlighting only touches the displayed copy; export and audio get plain text
+                display_text = filtered_text
+                if search_term:
+                    search_index = get_search_index(
+                        (document.sha256, tuple((s.page, s.source) for s in extracted.segments)),
+                        extracted,
+                    )
+                    matches = search_index.search(search_term)
+                    display_text = "\n\n".join(
+                        highlight(extracted.section(s), matches.get(s.page, ()), offset=s.start)
+                        for s in visible_segments
+                    )
+                    page_counts = [(s.page, len(matches[s.page])) for s in visible_segments if s.page in matches]
+                    st.caption(
+                        f"{sum(c for _, c in page_counts)} match(es)"
+                        + (" · " + ", ".join(f"p.{p}: {c}" for p, c in page_counts) if page_counts else "")
+                    )
+
+                text_class = "rtl-text" if content_lang == 'ar' else ""
+                display_text = get_display(display_text) if content_lang == 'ar' else display_text
+                display_html = display_text.replace("\n", "<br>")
+
+                st.markdown(f"""
+                <div class="text-container {text_class}">
+                    {display_html}
+                </div>
+                """, unsafe_allow_html=True)
+
+                # Download OCR/Text as PDF
+                if st.button("📄 Export Extracted Text as PDF"):
+                    st.download_button(
+                        label="Download PDF",
+                        data=export_text_to_pdf(filtered_text),
+                        file_name="extracted_text.pdf",
+                        mime="application/pdf"
+                    )
+
+        with col_right:
+            with st.expander("🔊 Audio Playback", expanded=True):
+                sections = [extracted.body(segment) for segment in visible_segments]
+                audio_key = (hash_bytes("\x00".join(sections).encode("utf-8")), tts_lang_code, tts_engine)
+                if st.button("Generate Audio", type="primary"):
+                    start_job("audio_job", "audio", audio_key, run_audio, sections, tts_lang_code, tts_engine)
+                audio_job = tracked_job("audio_job", "audio", audio_key)
+                if audio_job is not None:
+                    if not job_progress("audio_job", audio_job, "Generating audio..."):
+                        if audio_job.partial:
+                            st.caption("▶️ Playing the first part while the rest is generated...")
+                            render_playlist(AudioPlaylist(audio_job.partial), "audio", stem="audiobook")
+                    elif audio_job.state != DONE:
+                        st.error(f"Audio generation failed: {audio_job.error or audio_job.state}")
+                    else:
+                        directory, stats = audio_job.result
+                        st.caption(
+                            f"{stats['chunks']} chunks · first audio after {stats['time_to_first_audio']:.1f}s · "
+                            f"{stats['chars_per_second']:.0f} chars/s"
                         )
-
-                    text_class = "rtl-text" if content_lang == 'ar' else ""
-                    display_text = get_display(filtered_text) if content_lang == 'ar' else filtered_text
-
-                    st.markdown(f"""
-                    <div class="text-container {text_class}">
-                        {display_text.replace("\n", "<br>")}
-                    </div>
-                    """, unsafe_allow_html=True)
-
-                    # Download OCR/Text as PDF
-                    if st.button("📄 Export Extracted Text as PDF"):
-                        pdf_export = export_text_to_pdf(filtered_text)
-                        with open(pdf_export, "rb") as f:
-                            st.download_button(
-                                label="Download PDF",
-                                data=f,
-                                file_name="extracted_text.pdf",
-                                mime="application/pdf"
-                            )
-
-            with col_right:
-                with st.expander("🔊 Audio Playback", expanded=True):
-                    if st.button("Generate Audio", type="primary"):
-                        with st.spinner("Generating audio..."):
-                            audio_path = generate_audio(filtered_text, lang=tts_lang_code)
-                            if audio_path:
-                                st.audio(audio_path, format="audio/mp3")
-                                st.download_button(
-                                    "Download MP3",
-                                    data=open(audio_path, "rb").read(),
-                                    file_name="audiobook.mp3",
-                                    mime="audio/mpeg"
-                                )
-                                if url_link.strip():
-                                    st.markdown(f"""
-                                    <div style="margin-top: 1rem;">
-                                        🔗 <strong>Source Link:</strong> 
-                                        <a href="{url_link}" target="_blank">{url_link}</a>
-                                    </div>
-                                    """, unsafe_allow_html=True)
-
-            # Visual preview
-            with st.expander("🖼️ Page Previews", expanded=False):
-                images = convert_from_path(pdf_path, dpi=100, first_page=min(selected_pages), last_page=max(selected_pages))
-                for i, img in zip(selected_pages, images):
-                    st.image(img, caption=f"Page {i}", use_column_width=True)
+                        render_playlist(AudioPlaylist(directory), "audio", stem="audiobook")
+                        if url_link.strip():
+                            st.markdown(f"""
+                            <div style="margin-top: 1rem;">
+                                🔗 <strong>Source Link:</strong> 
+                                <a href="{url_link}" target="_blank">{url_link}</a>
+                            </div>
+                            """, unsafe_allow_html=True)
+
+        # Visual preview
+        with st.expander("🖼️ Page Previews", expanded=False):
+            # Expander bodies always execute, so rendering waits for an explicit opt-in
+            if st.checkbox("Show page previews", value=False, key="show_previews"):
+                per_row = st.select_slider("Previews per row", options=[1, 2, 3, 4], value=3)
+                preview_pages = sorted(set(selected_pages))
+                page_count = max(1, -(-len(preview_pages) // (per_row * PREVIEW_ROWS)))
+                preview_page = st.number_input("Preview page", min_value=1, max_value=page_count, value=1) - 1
+                visible, _ = paginate(preview_pages, preview_page, per_row * PREVIEW_ROWS)
+                thumbnails = get_thumbnail_service()
+                columns = st.columns(per_row)
+                for n, i in enumerate(visible):
+                    png = thumbnails.thumbnail(document, i, width=PREVIEW_CONTENT_WIDTH // per_row)
+                    if png:
+                        columns[n % per_row].image(png, caption=f"Page {i}", use_column_width=True)
 
 if __name__ == "__main__":
-    main()
+    start_rerun_profile()
+    try:
+        warm_up()
+        main()
+    finally:
+        # Also runs when st.rerun() or st.stop() cuts the script short
+        finish_rerun_profile()
+    render_diagnostics_panel()
 
 
@@ -0,0 +1,180 @@
+import math
+import os
+from collections import Counter
+
+TABULAR_EXTENSIONS = (".csv", ".xlsx")
+
+# Rows past this limit still feed the column summary but are not kept as chunks,
+# so memory stays bounded however large the export is
+MAX_ROWS = 100000
+ROWS_PER_CHUNK = 40
+MAX_CHUNK_CHARS = 1500
+MAX_DISTINCT = 1000
+TOP_VALUES = 5
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).replace("\n", " ").strip()
+
+
+def iter_row_batches(path, batch_rows=5000):
+    """Yield (sheet, header, rows) with rows as lists of strings, never holding a whole table."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        import pandas as pd
+
+        reader = pd.read_csv(path, chunksize=batch_rows, dtype=str, keep_default_na=False)
+        with reader:
+            for frame in reader:
+                yield None, [str(c) for c in frame.columns], [[_cell(v) for v in row] for row in frame.values.tolist()]
+    elif ext == ".xlsx":
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for sheet in workbook.worksheets:
+                rows = sheet.iter_rows(values_only=True)
+                header = next(rows, None)
+                if header is None:
+                    continue
+                header = [_cell(c) or f"column_{i + 1}" for i, c in enumerate(header)]
+                batch = []
+                for row in rows:
+                    if not any(c is not None for c in row):
+                        continue
+                    batch.append([_cell(c) for c in row])
+                    if len(batch) >= batch_rows:
+                        yield sheet.title, header, batch
+                        batch = []
+                if batch:
+                    yield sheet.title, header, batch
+        finally:
+            workbook.close()
+    else:
+        raise ValueError(f"Not a tabular file: {path}")
+
+
+class ColumnSummary:
+    __slots__ = ("name", "count", "empty", "numeric", "minimum", "maximum", "total", "values", "capped")
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.empty = 0
+        self.numeric = 0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.total = 0.0
+        self.values = Counter()
+        self.capped = False
+
+    def add(self, value):
+        self.count += 1
+        if value == "":
+            self.empty += 1
+            return
+        try:
+            number = float(value.replace(",", ""))
+        except ValueError:
+            number = None
+        if number is not None and math.isfinite(number):
+            self.numeric += 1
+            self.minimum = min(self.minimum, number)
+            self.maximum = max(self.maximum, number)
+            self.total += number
+        if value in self.values or len(self.values) < MAX_DISTINCT:
+            self.values[value] += 1
+        else:
+            self.capped = True
+
+    def describe(self):
+        filled = self.count - self.empty
+        parts = [f"{self.name}: {filled} values"]
+        if self.empty:
+            parts.append(f"{self.empty} empty")
+        if filled and self.numeric == filled:
+            parts.append(
+                f"numeric min {self.minimum:g}, max {self.maximum:g}, mean {self.total / self.numeric:g}"
+            )
+        else:
+            distinct = f"{len(self.values)}+" if self.capped else str(len(self.values))
+            top = ", ".join(f"{v} ({n})" for v, n in self.values.most_common(TOP_VALUES))
+            parts.append(f"{distinct} distinct; most common: {top}")
+        return "; ".join(parts)
+
+
+class TableChunker:
+    """
+    Streams a CSV/XLSX file into row-group chunks that repeat the header, plus a
+    per-column summary chunk for each sheet.
+    """
+
+    def __init__(self, name, rows_per_chunk=ROWS_PER_CHUNK, max_chunk_chars=MAX_CHUNK_CHARS, max_rows=MAX_ROWS):
+        self.name = name
+        self.rows_per_chunk = rows_per_chunk
+        self.max_chunk_chars = max_chunk_chars
+        self.max_rows = max_rows
+        self.row_chunks = []
+        self.summaries = {}
+        self.row_counts = Counter()
+        self.kept_rows = 0
+
+    def _label(self, sheet):
+        return f"{self.name} [{sheet}]" if sheet else self.name
+
+    def _flush(self, sheet, header, first, lines):
+        if lines:
+            self.row_chunks.append(
+                f"{self._label(sheet)} rows {first}-{first + len(lines) - 1}\n"
+                f"Columns: {' | '.join(header)}\n" + "\n".join(lines)
+            )
+
+    def add_batch(self, sheet, header, rows):
+        columns = self.summaries.get(sheet)
+        if columns is None:
+            columns = self.summaries[sheet] = [ColumnSummary(h) for h in header]
+        lines, first, size = [], self.row_counts[sheet] + 1, 0
+        for row in rows:
+            self.row_counts[sheet] += 1
+            for column, value in zip(columns, row):
+                column.add(value)
+            if self.kept_rows >= self.max_rows:
+                continue
+            self.kept_rows += 1
+            line = " | ".join(row)
+            if lines and (len(lines) >= self.rows_per_chunk or size + len(line) > self.max_chunk_chars):
+                self._flush(sheet, header, first, lines)
+                first += len(lines)
+                lines, size = [], 0
+            lines.append(line)
+            size += len(line) + 1
+        self._flush(sheet, header, first, lines)
+
+    def summary_chunks(self):
+        chunks = []
+        for sheet, columns in self.summaries.items():
+            rows = self.row_counts[sheet]
+            head = f"{self._label(sheet)} summary: {rows} rows, {len(columns)} columns"
+            if self.kept_rows >= self.max_rows:
+                head += f" (only the first {self.max_rows} rows are indexed row by row)"
+            lines = [head] + [c.describe() for c in columns]
+            chunk = []
+            for line in lines:
+                if chunk and sum(len(l) + 1 for l in chunk) + len(line) > self.max_chunk_chars:
+                    chunks.append("\n".join(chunk))
+                    chunk = [head]
+                chunk.append(line)
+            chunks.append("\n".join(chunk))
+        return chunks
+
+
+def table_chunks(path, **options):
+    """Summary chunks first, then row groups; each is small enough to be used as-is for retrieval."""
+    chunker = TableChunker(os.path.basename(path), **options)
+    for sheet, header, rows in iter_row_batches(path):
+        chunker.add_batch(sheet, header, rows)
+    return chunker.summary_chunks() + chunker.row_chunks
@@ -0,0 +1,46 @@
+from document_model import SOURCE_OCR, SOURCE_TEXT, ExtractedText
+
+
+def sample():
+    # Out of order on purpose, plus an empty page that must be dropped
+    return ExtractedText.from_pages([
+        (3, SOURCE_OCR, "ar", "  Scanned page three.  "),
+        (1, SOURCE_TEXT, "en", "Page one text."),
+        (2, SOURCE_TEXT, "en", "   "),
+    ])
+
+
+def test_from_pages_orders_pages_and_keeps_headers():
+    extracted = sample()
+    assert extracted.text == "--- Page 1 ---\nPage one text.\n\n--- Page 3 (OCR) ---\nScanned page three."
+    assert [s.page for s in extracted.segments] == [1, 3]
+    assert [s.source for s in extracted.segments] == [SOURCE_TEXT, SOURCE_OCR]
+
+
+def test_segment_offsets_slice_the_text():
+    extracted = sample()
+    first, second = extracted.segments
+    assert extracted.section(first) == "--- Page 1 ---\nPage one text."
+    assert extracted.body(first) == "Page one text."
+    assert extracted.body(second) == "Scanned page three."
+    assert extracted.text[first.end:second.start] == "\n\n"
+    assert second.end == len(extracted.text)
+
+
+def test_segment_at_maps_offsets_to_pages():
+    extracted = sample()
+    first, second = extracted.segments
+    assert extracted.segment_at(0) is first
+    assert extracted.segment_at(first.end - 1) is first
+    # The blank line between pages belongs to no page
+    assert extracted.segment_at(first.end) is None
+    assert extracted.segment_at(second.body_start) is second
+    assert extracted.segment_at(len(extracted.text)) is None
+
+
+def test_select_and_join():
+    extracted = sample()
+    ocr = extracted.select(sources={SOURCE_OCR})
+    assert [s.page for s in ocr] == [3]
+    assert extracted.join(ocr) == "--- Page 3 (OCR) ---\nScanned page three."
+    assert extracted.join() == extracted.text
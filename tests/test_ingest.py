@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+import folder_index
+from disk_cache import hash_file
+from folder_index import FolderIndex
+from ingest import ExtractResult, extract_files
+
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def by_path(results):
+    return {r.path: r for r in results}
+
+
+def test_extracts_files_and_skips_unchanged(tmp_path):
+    a = write(tmp_path / "a.txt", "alpha " * 100)
+    b = write(tmp_path / "b.txt", "beta " * 100)
+    results = by_path(extract_files([(a, None), (b, hash_file(b))], workers=2))
+    assert results[a].error is None and "alpha" in results[a].text and results[a].chunks
+    assert results[b].unchanged and results[b].sha256 == hash_file(b)
+
+
+def test_extraction_errors_are_per_file(tmp_path):
+    bad = write(tmp_path / "bad.docx", "not a zip file")
+    good = write(tmp_path / "good.txt", "fine")
+    results = by_path(extract_files([(bad, None), (good, None)], workers=1))
+    assert results[bad].error and not results[bad].transient
+    assert results[good].error is None and results[good].text == "fine"
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs a named pipe to block on")
+def test_timeout_kills_only_the_slow_file(tmp_path):
+    # Opening a FIFO without a writer blocks the worker until it is killed
+    slow = str(tmp_path / "slow.txt")
+    os.mkfifo(slow)
+    fast = write(tmp_path / "fast.txt", "quick")
+    results = by_path(extract_files([(slow, None), (fast, None)], workers=1, timeout=1.0))
+    assert results[slow].timed_out and "timed out" in results[slow].error
+    assert results[fast].error is None and results[fast].text == "quick"
+
+
+@pytest.mark.skipif(os.name != "posix", reason="the memory limit uses RLIMIT_AS")
+def test_memory_limit_fails_only_the_large_file(tmp_path):
+    small = write(tmp_path / "small.txt", "small")
+    # 16 MB of text takes several times that to decode and chunk; a fresh worker needs about 30 MB
+    large = write(tmp_path / "large.txt", "word " * 3_200_000)
+    after = write(tmp_path / "after.txt", "after")
+    # One worker, so the files after the large one depend on it being replaced
+    results = by_path(extract_files([(small, None), (large, None), (after, None)], workers=1, memory_mb=64))
+    assert "out of memory" in results[large].error
+    assert not results[large].transient
+    assert results[small].error is None
+    assert results[after].error is None and results[after].text == "after"
+
+
+def test_folder_index_does_not_store_worker_failures(tmp_path, monkeypatch):
+    path = write(tmp_path / "doc.txt", "text")
+
+    def broken_workers(tasks, **options):
+        for task_path, _ in tasks:
+            yield ExtractResult(task_path, error="extraction process exited with code -9", transient=True)
+
+    monkeypatch.setattr(folder_index, "extract_files", broken_workers)
+    index = FolderIndex(db_path=str(tmp_path / "index.sqlite"))
+    [entry] = index.ingest([path])
+    assert entry["status"] == "failed" and "exited" in entry["error"]
+    assert not index.is_fresh(path)
+
+    monkeypatch.undo()
+    [entry] = index.ingest([path])
+    assert entry["status"] == "indexed" and entry["text"] == "text"
+
+
+def test_folder_index_remembers_file_failures(tmp_path):
+    path = write(tmp_path / "bad.docx", "not a zip file")
+    index = FolderIndex(db_path=str(tmp_path / "index.sqlite"))
+    [entry] = index.ingest([path])
+    assert entry["status"] == "failed"
+    [entry] = index.ingest([path])
+    assert entry["status"] == "failed" and entry["seconds"] == 0.0
@@ -0,0 +1,38 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from llm_client import OllamaClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from ollama_stub import start_stub  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    server, url = start_stub(token_delay=0.002)
+    yield OllamaClient(base_url=url)
+    server.shutdown()
+
+
+def test_stream_fills_the_callers_metrics(client):
+    metrics = {}
+    answer = "".join(client.stream("Question: what?", metrics=metrics))
+    assert answer
+    assert metrics["prompt_chars"] == len("Question: what?")
+    assert metrics["tokens"] > 0 and metrics["time_to_first_token"] is not None
+
+
+def test_concurrent_requests_keep_their_own_metrics(client):
+    prompts = [f"Question {'x' * n}?" for n in range(1, 9)]
+
+    def ask(prompt):
+        metrics = {}
+        client.generate(prompt, metrics=metrics)
+        return metrics
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(ask, prompts))
+    assert [m["prompt_chars"] for m in results] == [len(p) for p in prompts]
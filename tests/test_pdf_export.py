@@ -0,0 +1,54 @@
+import io
+
+import pytest
+from bidi.algorithm import get_display
+from pypdf import PdfReader
+
+import pdf_export
+from pdf_export import export_text_to_pdf, unicode_font_path
+
+ARABIC = "مرحبا بالعالم"
+
+pytestmark = pytest.mark.skipif(unicode_font_path() is None, reason="needs a Unicode TTF font")
+
+
+def glyphs_left_to_right(data):
+    """Characters of every drawn glyph, ordered by their position on the page."""
+    pdfminer = pytest.importorskip("pdfminer.high_level")
+    from pdfminer.layout import LTChar
+
+    chars = []
+
+    def walk(item):
+        if isinstance(item, LTChar):
+            chars.append((round(-item.y0), item.x0, item.get_text()))
+        elif hasattr(item, "__iter__"):
+            for child in item:
+                walk(child)
+
+    for page in pdfminer.extract_pages(io.BytesIO(data)):
+        walk(page)
+    return "".join(char for _, _, char in sorted(chars))
+
+
+@pytest.mark.skipif(not pdf_export.has_text_shaping(), reason="needs uharfbuzz")
+def test_shaped_arabic_reads_back_in_logical_order():
+    data = export_text_to_pdf(f"Hello\n{ARABIC}")
+    text = PdfReader(io.BytesIO(data)).pages[0].extract_text()
+    assert text.splitlines() == ["Hello", ARABIC]
+
+
+@pytest.mark.skipif(not pdf_export.has_text_shaping(), reason="needs uharfbuzz")
+def test_shaped_arabic_is_drawn_right_to_left():
+    data = export_text_to_pdf(ARABIC)
+    # The leftmost glyph is the last letter of the last word
+    assert glyphs_left_to_right(data) == get_display(ARABIC)
+
+
+def test_unshaped_arabic_is_reshaped_and_reordered(monkeypatch):
+    reshape = pdf_export.arabic_reshaper()
+    if reshape is None:
+        pytest.skip("needs arabic-reshaper")
+    monkeypatch.setattr(pdf_export, "has_text_shaping", lambda: False)
+    data = export_text_to_pdf(ARABIC)
+    assert glyphs_left_to_right(data) == get_display(reshape(ARABIC))
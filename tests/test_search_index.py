@@ -0,0 +1,55 @@
+from document_model import SOURCE_OCR, SOURCE_TEXT, ExtractedText
+from search_index import InvertedIndex, highlight
+
+
+def sample():
+    return ExtractedText.from_pages([
+        (1, SOURCE_TEXT, "en", "Page one text."),
+        (3, SOURCE_OCR, "ar", "Scanned page three."),
+    ])
+
+
+def build_index(extracted):
+    index = InvertedIndex()
+    for segment in extracted.segments:
+        index.add(segment.page, extracted.body(segment), base_offset=segment.body_start)
+    return index
+
+
+def test_search_offsets_point_into_extracted_text():
+    extracted = sample()
+    index = build_index(extracted)
+    results = index.search("page three", prefix=False)
+    assert list(results) == [3]
+    [(start, end)] = results[3]
+    assert extracted.text[start:end] == "page three"
+    assert extracted.segment_at(start).page == 3
+
+
+def test_search_phrase_and_prefix():
+    index = InvertedIndex()
+    index.add("a", "The quick brown fox. Quick thinking.")
+    index.add("b", "brown quick fox")
+    assert index.counts("quick brown", prefix=False) == {"a": 1}
+    assert index.counts("qui") == {"a": 2, "b": 1}
+    assert index.search("missing") == {}
+
+
+def test_reindexing_a_document_replaces_its_postings():
+    index = InvertedIndex()
+    index.add("a", "alpha beta")
+    index.add("a", "gamma")
+    assert index.search("alpha") == {}
+    assert index.counts("gamma") == {"a": 1}
+    index.remove("a")
+    assert len(index) == 0 and index.postings == {}
+
+
+def test_highlight_uses_absolute_offsets():
+    extracted = sample()
+    index = build_index(extracted)
+    segment = extracted.segments[0]
+    body = extracted.body(segment)
+    marked = highlight(body, index.search("one")[1], offset=segment.body_start)
+    assert marked == "Page <mark>one</mark> text."
+    assert highlight("<a> b", [(4, 5)], escape=True) == "&lt;a&gt; <mark>b</mark>"
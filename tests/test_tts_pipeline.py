@@ -0,0 +1,141 @@
+import random
+import time
+
+import pytest
+
+from tts_pipeline import (
+    MP3_FRAME_SECONDS,
+    SILENT_MP3_FRAME,
+    iter_synthesized,
+    join_mp3,
+    mp3_duration,
+    silent_synthesize,
+    split_sections,
+    split_text,
+    strip_id3,
+    synthesize_chunks,
+)
+
+
+def id3v2(payload=b"\x00" * 20):
+    size = len(payload)
+    synchsafe = bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    return b"ID3\x04\x00\x00" + synchsafe + payload
+
+
+def id3v1():
+    return b"TAG" + b"\x00" * 125
+
+
+def test_split_sections_never_spans_sections():
+    chunks = split_sections(["First page. Still first.", "", "Second page."], max_chars=900)
+    assert chunks == ["First page. Still first.", "Second page."]
+
+
+def test_split_sections_packs_sentences_up_to_max_chars():
+    sentence = "word " * 9 + "end."
+    chunks = split_sections([" ".join([sentence] * 10)], max_chars=120)
+    assert all(len(c) <= 120 for c in chunks)
+    assert " ".join(chunks) == " ".join([sentence.strip()] * 10)
+
+
+def test_split_sections_cuts_long_sentences_at_word_boundaries():
+    text = " ".join(f"w{i}" for i in range(200))
+    chunks = split_sections([text], max_chars=50)
+    assert all(len(c) <= 50 for c in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_split_text_splits_on_page_markers():
+    text = "--- Page 1 ---\nOne.\n\n--- Page 2 (OCR) ---\nTwo."
+    assert split_text(text) == ["One.", "Two."]
+
+
+def test_iter_synthesized_yields_in_chunk_order():
+    chunks = [f"chunk {i}" for i in range(25)]
+    rng = random.Random(0)
+
+    def synthesize(text, lang):
+        # Later chunks often finish first
+        time.sleep(rng.random() * 0.01)
+        return f"{lang}:{text}".encode()
+
+    results = list(iter_synthesized(chunks, "fr", synthesize, max_workers=4))
+    assert [i for i, _ in results] == list(range(25))
+    assert [audio for _, audio in results] == [f"fr:{c}".encode() for c in chunks]
+
+
+def test_iter_synthesized_submits_a_bounded_window():
+    submitted = []
+
+    def synthesize(text, lang):
+        submitted.append(text)
+        return b""
+
+    chunks = iter(str(i) for i in range(100))
+    results = iter_synthesized(chunks, "en", synthesize, max_workers=2)
+    next(results)
+    # Two per worker ahead of the consumer, plus the one that triggered the first yield
+    assert len(submitted) <= 2 * 2 + 1
+    results.close()
+
+
+def test_iter_synthesized_propagates_errors():
+    def synthesize(text, lang):
+        if text == "bad":
+            raise RuntimeError("tts failed")
+        return b"ok"
+
+    with pytest.raises(RuntimeError):
+        list(iter_synthesized(["a", "bad", "c"], "en", synthesize, max_workers=2))
+
+
+def test_strip_id3_removes_v2_header_and_v1_trailer():
+    frames = SILENT_MP3_FRAME * 3
+    assert strip_id3(id3v2() + frames + id3v1()) == frames
+    assert strip_id3(frames) == frames
+
+
+def test_join_mp3_strips_tags_between_parts():
+    part = SILENT_MP3_FRAME * 2
+    joined = join_mp3([id3v2() + part + id3v1(), id3v2() + part])
+    assert joined == part + part
+    assert b"ID3" not in joined and b"TAG" not in joined
+
+
+def test_mp3_duration_counts_frames():
+    assert mp3_duration(SILENT_MP3_FRAME * 10) == pytest.approx(10 * MP3_FRAME_SECONDS)
+    assert mp3_duration(id3v2() + SILENT_MP3_FRAME * 4 + id3v1()) == pytest.approx(4 * MP3_FRAME_SECONDS)
+    assert mp3_duration(b"") == 0.0
+
+
+def test_silent_synthesize_length_tracks_text():
+    short, long = silent_synthesize("a" * 15), silent_synthesize("a" * 150)
+    assert mp3_duration(short) == pytest.approx(1.0, abs=MP3_FRAME_SECONDS)
+    assert mp3_duration(long) == pytest.approx(10.0, abs=MP3_FRAME_SECONDS)
+
+
+def test_synthesize_chunks_plays_the_first_chunk_before_the_rest_finish():
+    chunks = [f"chunk {i}." for i in range(6)]
+    finished = []
+
+    def synthesize(text, lang):
+        # The first chunk is quick, the rest take a while
+        time.sleep(0.01 if text == chunks[0] else 0.2)
+        finished.append(text)
+        return silent_synthesize(text, lang)
+
+    calls = []
+    audio, stats = synthesize_chunks(
+        chunks, "en", synthesize, max_workers=2, on_chunk=lambda i, a: calls.append((i, len(finished)))
+    )
+    assert [i for i, _ in calls] == list(range(6))
+    _, done_at_first_call = calls[0]
+    assert done_at_first_call < len(chunks)
+    assert stats["time_to_first_audio"] < 0.15 < stats["total_seconds"]
+    # Five slow chunks on two workers take three rounds, not five
+    assert stats["total_seconds"] < 5 * 0.2
+    assert stats["chunks"] == 6 and stats["chars"] == sum(len(c) for c in chunks)
+    assert stats["chars_per_second"] == pytest.approx(stats["chars"] / stats["total_seconds"])
+    assert audio == join_mp3([silent_synthesize(c) for c in chunks])
+    assert stats["bytes"] == len(audio)
@@ -0,0 +1,41 @@
+import io
+
+from disk_cache import DiskCache, make_key
+from metrics import stage
+
+
+class ThumbnailService:
+    """Renders single-page previews on demand and caches them as PNGs by document hash, page and width."""
+
+    def __init__(self, cache=None):
+        self.cache = cache or DiskCache("thumbnails", max_bytes=256 * 1024 * 1024)
+
+    @staticmethod
+    def bucket_width(width):
+        # Snap to 100px steps so small layout changes reuse cached renders
+        return max(100, int(round(width / 100.0)) * 100)
+
+    def thumbnail(self, document, page, width=400):
+        """document is a PdfDocument; its .path (a temp copy) is only touched on a cache miss."""
+        width = self.bucket_width(width)
+        key = make_key(document.sha256, page, "thumbnail", width)
+        png = self.cache.get(key)
+        if png is None:
+            from pdf2image import convert_from_path
+
+            # size=(width, None) lets poppler pick the DPI that yields this width
+            with stage("thumbnail.render", pages=1):
+                images = convert_from_path(document.path, first_page=page, last_page=page, size=(width, None))
+            if not images:
+                return None
+            buf = io.BytesIO()
+            images[0].save(buf, format="PNG", optimize=True)
+            png = buf.getvalue()
+            self.cache.put(key, png)
+        return png
+
+
+def paginate(items, page_index, per_page):
+    page_count = max(1, -(-len(items) // per_page))
+    page_index = min(max(page_index, 0), page_count - 1)
+    return items[page_index * per_page:(page_index + 1) * per_page], page_count
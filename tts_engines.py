@@ -0,0 +1,250 @@
+import functools
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+
+from metrics import stage
+from ocr_engine import available_cores
+from tts_pipeline import gtts_synthesize, silent_synthesize
+
+# Tried in this order when neither the caller nor TAKTAK_TTS_ENGINES picks one for a language
+ENGINE_ORDER = ("gtts", "espeak", "pyttsx3")
+AUDIO_MIME = {"mp3": "audio/mpeg", "wav": "audio/wav"}
+
+
+class TtsEngine:
+    """
+    A text-to-speech backend: synthesize(text, lang) returns one audio file in self.format.
+
+    max_workers is how many chunks are worth synthesizing at once: network backends are
+    bound by request latency, local ones by CPU cores.
+    """
+
+    name = ""
+    label = ""
+    format = "mp3"
+    offline = False
+    max_workers = 4
+
+    @property
+    def cache_name(self):
+        # Part of the audio cache key; include anything that changes the sound
+        return self.name
+
+    def available(self):
+        return True
+
+    def supports(self, lang):
+        return True
+
+    def synthesize(self, text, lang="en"):
+        raise NotImplementedError
+
+    def __call__(self, text, lang="en"):
+        return self.synthesize(text, lang)
+
+
+class GttsEngine(TtsEngine):
+    name = "gtts"
+    label = "gTTS (online)"
+
+    def available(self):
+        try:
+            import gtts  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    @functools.lru_cache(maxsize=None)
+    def languages(self):
+        from gtts.lang import tts_langs
+
+        return frozenset(tts_langs())
+
+    def supports(self, lang):
+        return lang in self.languages()
+
+    def synthesize(self, text, lang="en"):
+        return gtts_synthesize(text, lang)
+
+
+class EspeakEngine(TtsEngine):
+    """eSpeak NG through its command line; each chunk is its own process, so chunks run on all cores."""
+
+    name = "espeak"
+    label = "eSpeak NG (offline)"
+    format = "wav"
+    offline = True
+    VOICES = {"en": "en-us", "ar": "ar", "es": "es", "fr": "fr", "de": "de"}
+
+    def __init__(self, rate=165, binary=None):
+        self.rate = rate
+        self.binary = binary or shutil.which("espeak-ng") or shutil.which("espeak")
+        self.max_workers = available_cores()
+
+    @property
+    def cache_name(self):
+        return f"{self.name}:{self.rate}"
+
+    def available(self):
+        return self.binary is not None
+
+    @functools.lru_cache(maxsize=None)
+    def languages(self):
+        try:
+            output = subprocess.run(
+                [self.binary, "--voices"], capture_output=True, text=True, check=True, timeout=10
+            ).stdout
+        except (OSError, subprocess.SubprocessError):
+            return frozenset(self.VOICES)
+        # Columns: Pty Language Age/Gender VoiceName File Other
+        return frozenset(line.split()[1].split("-")[0] for line in output.splitlines()[1:] if line.split())
+
+    def supports(self, lang):
+        return self.available() and lang in self.languages()
+
+    def synthesize(self, text, lang="en"):
+        with stage("tts.espeak") as info:
+            audio = subprocess.run(
+                [self.binary, "--stdout", "--stdin", "-b", "1", "-v", self.VOICES.get(lang, lang), "-s", str(self.rate)],
+                input=text.encode("utf-8"),
+                capture_output=True,
+                check=True,
+            ).stdout
+            info["bytes"] = len(audio)
+        return audio
+
+
+class Pyttsx3Engine(TtsEngine):
+    """
+    The system voice through pyttsx3 (SAPI5 on Windows, eSpeak on Linux). pyttsx3 drives one
+    event loop per process, so chunks are synthesized one at a time.
+    """
+
+    name = "pyttsx3"
+    label = "System voice (offline)"
+    format = "wav"
+    offline = True
+    max_workers = 1
+    _lock = threading.Lock()
+    # SAPI5 reports Windows LCIDs; the low ten bits are the primary language
+    LCID_LANGUAGES = {0x01: "ar", 0x07: "de", 0x09: "en", 0x0A: "es", 0x0C: "fr"}
+
+    def available(self):
+        try:
+            import pyttsx3  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    @classmethod
+    def language_code(cls, tag):
+        """
+        Primary language subtag of a voice's language entry: eSpeak's bytes prefixed with a
+        priority byte (b"\\x05en-us"), NSSpeech's "en_US" or a SAPI5 hex LCID such as "409".
+        """
+        if isinstance(tag, bytes):
+            tag = tag.decode("utf-8", "ignore")
+        tag = "".join(c for c in str(tag) if c.isprintable()).strip().lower()
+        if len(tag) >= 3 and any(c.isdigit() for c in tag):
+            try:
+                return cls.LCID_LANGUAGES.get(int(tag, 16) & 0x3FF, "")
+            except ValueError:
+                pass
+        return tag.replace("_", "-").split("-")[0]
+
+    @functools.lru_cache(maxsize=None)
+    def voices(self):
+        """{language code: voice id}, the first installed voice for each language."""
+        import pyttsx3
+
+        voices = {}
+        with self._lock:
+            try:
+                installed = pyttsx3.init().getProperty("voices")
+            except (RuntimeError, OSError):
+                # No usable speech driver on this system
+                installed = []
+            for voice in installed:
+                for tag in getattr(voice, "languages", None) or []:
+                    voices.setdefault(self.language_code(tag), voice.id)
+        voices.pop("", None)
+        return voices
+
+    def supports(self, lang):
+        return self.available() and lang in self.voices()
+
+    def synthesize(self, text, lang="en"):
+        import pyttsx3
+
+        voice_id = self.voices().get(lang)
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            with self._lock, stage("tts.pyttsx3") as info:
+                engine = pyttsx3.init()
+                if voice_id is not None:
+                    engine.setProperty("voice", voice_id)
+                engine.save_to_file(text, path)
+                engine.runAndWait()
+                with open(path, "rb") as f:
+                    audio = f.read()
+                info["bytes"] = len(audio)
+        finally:
+            os.remove(path)
+        return audio
+
+
+class SilentEngine(TtsEngine):
+    """Offline stand-in that returns silence as long as the text would take to read; for tests and benchmarks."""
+
+    name = "silent"
+    label = "Silent (testing)"
+    offline = True
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def synthesize(self, text, lang="en"):
+        return silent_synthesize(text, lang, latency=self.latency)
+
+
+ENGINES = {
+    "gtts": GttsEngine,
+    "espeak": EspeakEngine,
+    "pyttsx3": Pyttsx3Engine,
+    "silent": SilentEngine,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def get_engine(name):
+    return ENGINES[name]()
+
+
+def available_engines():
+    return [name for name in ENGINES if name != "silent" and get_engine(name).available()]
+
+
+def engine_preferences():
+    """Per-language engine choice from TAKTAK_TTS_ENGINES, e.g. "default=espeak,ar=gtts"."""
+    preferences = {}
+    for item in os.environ.get("TAKTAK_TTS_ENGINES", "").split(","):
+        lang, _, name = item.partition("=")
+        if name.strip() in ENGINES:
+            preferences[lang.strip()] = name.strip()
+    return preferences
+
+
+def select_engine(lang, preferred=None):
+    """The preferred engine if it can speak lang, else the configured one, else the first that can."""
+    preferences = engine_preferences()
+    candidates = [preferred, preferences.get(lang), preferences.get("default"), *ENGINE_ORDER]
+    for name in candidates:
+        if name in ENGINES:
+            engine = get_engine(name)
+            if engine.available() and engine.supports(lang):
+                return engine
+    return get_engine("gtts")
@@ -0,0 +1,259 @@
+import io
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import stage
+
+PAGE_MARKER_RE = re.compile(r"^--- Page \d+[^\n]*---$", re.MULTILINE)
+SENTENCE_END_RE = re.compile(r"(?<=[.!?;:。؟؛])\s+")
+
+# A silent MPEG-1 Layer III frame: 128 kbps, 44.1 kHz, 417 bytes, 1152 samples
+SILENT_MP3_FRAME = b"\xff\xfb\x90\x00" + b"\x00" * 413
+MP3_FRAME_SECONDS = 1152 / 44100
+
+
+def split_text(text, max_chars=900):
+    """Split text into synthesis chunks at page and sentence boundaries."""
+    return split_sections(PAGE_MARKER_RE.split(text), max_chars=max_chars)
+
+
+def split_sections(sections, max_chars=900):
+    """Split already separated page texts into synthesis chunks; chunks never span two sections."""
+    chunks = []
+    for page in sections:
+        page = page.strip()
+        if not page:
+            continue
+        current = ""
+        for sentence in SENTENCE_END_RE.split(page):
+            sentence = " ".join(sentence.split())
+            if not sentence:
+                continue
+            # Sentences longer than a chunk are cut at word boundaries
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(" ", 0, max_chars)
+                if cut <= 0:
+                    cut = max_chars
+                if current:
+                    chunks.append(current)
+                    current = ""
+                chunks.append(sentence[:cut].strip())
+                sentence = sentence[cut:].strip()
+            if current and len(current) + 1 + len(sentence) > max_chars:
+                chunks.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}" if current else sentence
+        if current:
+            chunks.append(current)
+    return [c for c in chunks if c]
+
+
+def strip_id3(data):
+    # Drop ID3v2 headers and ID3v1 trailers so MP3 frames can be concatenated
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        footer = 10 if data[5] & 0x10 else 0
+        data = data[10 + size + footer:]
+    if len(data) >= 128 and data[-128:-125] == b"TAG":
+        data = data[:-128]
+    return data
+
+
+# MPEG audio frame header tables: bitrates (kbps) for Layer III and sample rates per version
+_MP3_BITRATES = {
+    3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],  # MPEG-1
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],  # MPEG-2
+    0: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],  # MPEG-2.5
+}
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def mp3_duration(data):
+    """Playback seconds of a Layer III stream, summed over its frame headers."""
+    data = strip_id3(data)
+    seconds = 0.0
+    i = 0
+    n = len(data)
+    while i + 4 <= n:
+        if data[i] != 0xFF or (data[i + 1] & 0xE0) != 0xE0:
+            i += 1
+            continue
+        version = (data[i + 1] >> 3) & 0x03
+        bitrate_index = data[i + 2] >> 4
+        rate_index = (data[i + 2] >> 2) & 0x03
+        if version == 1 or bitrate_index in (0, 15) or rate_index == 3:
+            i += 1
+            continue
+        bitrate = _MP3_BITRATES[version][bitrate_index] * 1000
+        sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+        padding = (data[i + 2] >> 1) & 0x01
+        samples = 1152 if version == 3 else 576
+        frame_length = samples // 8 * bitrate // sample_rate + padding
+        if frame_length <= 4:
+            i += 1
+            continue
+        seconds += samples / sample_rate
+        i += frame_length
+    return seconds
+
+
+def join_mp3(parts):
+    return b"".join(strip_id3(p) for p in parts)
+
+
+def _riff_chunks(data):
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        size = int.from_bytes(data[pos + 4:pos + 8], "little")
+        # Streamed WAVs (espeak --stdout) carry a placeholder size; the slice just takes the rest
+        yield chunk_id, data[pos + 8:pos + 8 + size]
+        pos += 8 + size + (size & 1)
+
+
+def split_wav(data):
+    """Return (fmt chunk body, PCM bytes) of a WAV file; fmt is None when there is none."""
+    fmt = None
+    pcm = []
+    for chunk_id, body in _riff_chunks(data):
+        if chunk_id == b"fmt " and fmt is None:
+            fmt = body
+        elif chunk_id == b"data":
+            pcm.append(body)
+    return fmt, b"".join(pcm)
+
+
+def wav_header(fmt, data_size):
+    return (
+        b"RIFF" + (4 + 8 + len(fmt) + 8 + data_size).to_bytes(4, "little") + b"WAVE"
+        + b"fmt " + len(fmt).to_bytes(4, "little") + fmt
+        + b"data" + data_size.to_bytes(4, "little")
+    )
+
+
+def join_wav(parts):
+    """Concatenate WAV files that share one sample format into a single WAV."""
+    fmt = None
+    pcm = []
+    for part in parts:
+        part_fmt, part_pcm = split_wav(part)
+        fmt = fmt or part_fmt
+        pcm.append(part_pcm)
+    if fmt is None:
+        return b""
+    data = b"".join(pcm)
+    return wav_header(fmt, len(data)) + data
+
+
+def wav_duration(data):
+    byte_rate = 0
+    frames = 0
+    for chunk_id, body in _riff_chunks(data):
+        if chunk_id == b"fmt " and len(body) >= 12:
+            byte_rate = int.from_bytes(body[8:12], "little")
+        elif chunk_id == b"data":
+            frames += len(body)
+    return frames / byte_rate if byte_rate else 0.0
+
+
+def join_audio(parts, audio_format="mp3"):
+    return join_wav(parts) if audio_format == "wav" else join_mp3(parts)
+
+
+def audio_duration(data, audio_format="mp3"):
+    return wav_duration(data) if audio_format == "wav" else mp3_duration(data)
+
+
+def warm_up():
+    import gtts  # noqa: F401
+
+
+def gtts_synthesize(text, lang="en"):
+    from gtts import gTTS
+
+    with stage("tts.gtts") as info:
+        buf = io.BytesIO()
+        gTTS(text=text, lang=lang, slow=False).write_to_fp(buf)
+        info["bytes"] = buf.tell()
+    return buf.getvalue()
+
+
+def silent_synthesize(text, lang="en", chars_per_second=15.0, latency=0.0):
+    """Local stand-in for a TTS backend: silent MP3 roughly as long as the text would be read."""
+    if latency:
+        time.sleep(latency)
+    frames = max(1, int(len(text) / chars_per_second / MP3_FRAME_SECONDS))
+    return SILENT_MP3_FRAME * frames
+
+
+def iter_synthesized(chunks, lang="en", synthesize=gtts_synthesize, max_workers=4):
+    """
+    Yield (index, audio_bytes) in chunk order while later chunks render concurrently.
+    At most twice max_workers chunks are submitted ahead, so memory does not grow with
+    the number of chunks.
+    """
+    max_workers = max(1, max_workers)
+    pending = deque()
+    index = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        try:
+            for chunk in chunks:
+                pending.append(pool.submit(synthesize, chunk, lang))
+                if len(pending) >= 2 * max_workers:
+                    yield index, pending.popleft().result()
+                    index += 1
+            while pending:
+                yield index, pending.popleft().result()
+                index += 1
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+
+
+def synthesize_chunks(chunks, lang="en", synthesize=gtts_synthesize, max_workers=4, on_chunk=None, audio_format="mp3"):
+    """
+    Synthesize chunks concurrently and join them in order.
+
+    on_chunk(index, audio_bytes) is called in chunk order as soon as each chunk and all
+    chunks before it are ready, so the first one can be played while the rest render.
+    audio_format ("mp3" or "wav") is what synthesize returns. Returns (audio_bytes, stats).
+    """
+    start = time.perf_counter()
+    first_audio = None
+    parts = []
+    for index, audio in iter_synthesized(chunks, lang, synthesize, max_workers):
+        if first_audio is None:
+            first_audio = time.perf_counter() - start
+        parts.append(audio)
+        if on_chunk is not None:
+            on_chunk(index, audio)
+
+    audio = join_audio(parts, audio_format)
+    elapsed = time.perf_counter() - start
+    chars = sum(len(c) for c in chunks)
+    stats = {
+        "chunks": len(chunks),
+        "chars": chars,
+        "bytes": len(audio),
+        "time_to_first_audio": first_audio or 0.0,
+        "total_seconds": elapsed,
+        "chars_per_second": chars / elapsed if elapsed else 0.0,
+        "format": audio_format,
+    }
+    return audio, stats
+
+
+def synthesize_text(text, lang="en", synthesize=gtts_synthesize, max_workers=4, max_chars=900, on_chunk=None,
+                    audio_format="mp3"):
+    return synthesize_chunks(
+        split_text(text, max_chars=max_chars),
+        lang=lang,
+        synthesize=synthesize,
+        max_workers=max_workers,
+        on_chunk=on_chunk,
+        audio_format=audio_format,
+    )
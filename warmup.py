@@ -0,0 +1,22 @@
+import threading
+import time
+
+from metrics import METRICS
+
+
+def _run(tasks):
+    for name, fn in tasks:
+        start = time.perf_counter()
+        error = None
+        try:
+            fn()
+        except Exception as e:
+            error = type(e).__name__
+        METRICS.record(f"warm_up.{name}", time.perf_counter() - start, error=error)
+
+
+def warm_up_in_background(*tasks):
+    """Run (name, fn) warm-up tasks on a daemon thread so the first page renders without waiting for them."""
+    thread = threading.Thread(target=_run, args=(tasks,), name="warm-up", daemon=True)
+    thread.start()
+    return thread